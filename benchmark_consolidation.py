@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for building consolidated activity logs.
+
+Compares the single-pass consolidate_activity_logs against the previous
+groupby/drop_duplicates/merge/sort path on a synthetic enriched activity log.
+
+Usage: python3 benchmark_consolidation.py [--rows 1000000] [--repeat 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from compute_backend import consolidate_activity_logs
+
+GROUP_BY_COLUMNS = ["Customer Name", "Customer ID", "Job ID", "Action Performed"]
+
+def make_enriched_logs(rows, seed=0):
+    """
+    Build a synthetic enriched activity log shaped like the pipeline's.
+    """
+    rng = np.random.default_rng(seed)
+    n_jobs = max(rows // 20, 1)
+    n_customers = max(n_jobs // 3, 1)
+    
+    job_ids = rng.integers(100000, 100000 + n_jobs, rows)
+    customer_ids = job_ids % n_customers
+    actions = ["Call", "Email", "Text", "Visit", "Quote Sent", "Follow Up", None]
+    
+    return pd.DataFrame({
+        "Job ID": pd.array(job_ids, dtype="Int64"),
+        "Action Performed": pd.Categorical(rng.choice(actions, rows)),
+        "Date": rng.choice(pd.date_range("2024-01-01", periods=60).strftime("%m/%d/%Y"), rows),
+        "Time": rng.choice(["09:00", "11:30", "14:15", "16:45"], rows),
+        "Performed By": rng.choice(["alice", "bob", "carol"], rows),
+        "Customer ID": pd.array(customer_ids, dtype="Int64"),
+        "Customer Name": pd.array([f"Customer {i}" for i in customer_ids], dtype="string"),
+        "Business Unit": rng.choice(["HVAC", "Plumbing", "Electrical"], rows),
+        "Job Type": rng.choice(["Install", "Repair", "Maintenance"], rows),
+        "Job Total": rng.random(rows).round(2) * 10000,
+        "Zip": rng.integers(10000, 99999, rows)
+    })
+
+def legacy_consolidation(enriched_logs, group_by_columns, job_consistent_columns):
+    """
+    The previous consolidation: count, de-duplicate jobs, merge and sort.
+    """
+    action_counts = enriched_logs.groupby(group_by_columns, observed=True).size().reset_index(name='Count')
+    job_data = enriched_logs[group_by_columns[:3] + job_consistent_columns].drop_duplicates(
+        subset=group_by_columns[:3])
+    consolidated_logs = pd.merge(action_counts, job_data, on=group_by_columns[:3], how='left')
+    return consolidated_logs.sort_values(
+        [group_by_columns[0], group_by_columns[2], 'Count'],
+        ascending=[True, True, False]
+    )
+
+def best_time(func, repeat):
+    """
+    Run func repeat times and return (best seconds, last result).
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark consolidation of enriched activity logs.")
+    parser.add_argument("--rows", type=int, default=1000000, help="Rows in the synthetic log (default: 1000000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per implementation (default: 3)")
+    args = parser.parse_args()
+    
+    print(f"Building synthetic enriched log with {args.rows} rows...")
+    enriched_logs = make_enriched_logs(args.rows)
+    job_consistent_columns = [col for col in enriched_logs.columns
+                              if col not in ("Action Performed", "Date", "Time")
+                              and col not in GROUP_BY_COLUMNS]
+    
+    legacy_time, legacy = best_time(
+        lambda: legacy_consolidation(enriched_logs, GROUP_BY_COLUMNS, job_consistent_columns), args.repeat)
+    single_time, single = best_time(
+        lambda: consolidate_activity_logs(enriched_logs, GROUP_BY_COLUMNS, job_consistent_columns), args.repeat)
+    unsorted_time, _ = best_time(
+        lambda: consolidate_activity_logs(enriched_logs, GROUP_BY_COLUMNS, job_consistent_columns, sort=False),
+        args.repeat)
+    
+    identical = legacy.reset_index(drop=True).equals(single.reset_index(drop=True))
+    
+    print(f"Consolidated rows:          {len(single)}")
+    print(f"Previous path:              {legacy_time:.3f}s")
+    print(f"Single pass (sorted):       {single_time:.3f}s  ({legacy_time / single_time:.2f}x)")
+    print(f"Single pass (group order):  {unsorted_time:.3f}s  ({legacy_time / unsorted_time:.2f}x)")
+    print(f"Identical output:           {identical}")
+    
+    return identical
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
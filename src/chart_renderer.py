@@ -0,0 +1,419 @@
+import os
+import json
+import base64
+import hashlib
+from html import escape
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+
+# Actions shown in the activity breakdown chart
+TOP_ACTIONS = 10
+
+CHART_CACHE_DIRNAME = ".chart_cache"
+
+# Shared directory for chart images written as separate files (asset mode)
+CHART_ASSETS_DIRNAME = "assets"
+
+# Default disk budget for cached chart images
+DEFAULT_CHART_CACHE_MB = 64
+
+# Everything besides a chart's spec that changes its image. Bump the version
+# when the drawing code changes so cached charts are rendered again.
+CHART_STYLE = {
+    "version": 1,
+    "axes_style": "whitegrid",
+    "figsize": [10, 6],
+    "format": "png"
+}
+
+def funnel_chart_spec(report_data):
+    """
+    Describe the conversion funnel chart of a conversion report.
+    """
+    return {
+        "kind": "funnel",
+        "stages": ['Total Customers', 'Converted Customers'],
+        "values": [
+            int(report_data.get("total_customers", 0)),
+            int(report_data.get("all_sales_customers", 0))
+        ],
+        "conversion_rate": float(report_data.get("conversion_rate", 0))
+    }
+
+def action_breakdown_spec(consolidated_data):
+    """
+    Describe the actions performed chart of consolidated activity logs, or
+    return None if they have no 'Action Performed' and 'Count' columns.
+    Only the top actions' counts end up in the spec, not the logs.
+    """
+    if 'Action Performed' not in consolidated_data.columns or 'Count' not in consolidated_data.columns:
+        return None
+    
+    # Aggregate data by action
+    action_counts = consolidated_data.groupby('Action Performed', observed=True)['Count'].sum().reset_index()
+    action_counts = action_counts.sort_values('Count', ascending=False)
+    
+    # Limit to top 10 actions for readability
+    if len(action_counts) > TOP_ACTIONS:
+        action_counts = action_counts.head(TOP_ACTIONS)
+        chart_title = 'Top 10 Actions Performed'
+    else:
+        chart_title = 'Actions Performed'
+    
+    return {
+        "kind": "action_breakdown",
+        "title": chart_title,
+        "actions": [str(action) for action in action_counts['Action Performed']],
+        "counts": [int(count) for count in action_counts['Count']]
+    }
+
+def report_chart_specs(conversion_report, consolidated_data=None):
+    """
+    Describe every chart of a unit's HTML report, keyed by chart name.
+    """
+    specs = {"funnel": funnel_chart_spec(conversion_report)}
+    if consolidated_data is not None and 'Action Performed' in consolidated_data.columns:
+        specs["action_breakdown"] = action_breakdown_spec(consolidated_data)
+    return specs
+
+def draw_funnel(figure, spec):
+    """
+    Draw a conversion funnel chart on an empty figure.
+    """
+    ax = figure.add_subplot()
+    values = spec["values"]
+    
+    # Create horizontal bar chart for funnel
+    colors = ['#3498db', '#2ecc71']
+    bars = ax.barh(spec["stages"], values, color=colors, height=0.5)
+    
+    # Add data labels
+    for bar in bars:
+        width = bar.get_width()
+        label_x_pos = width if width < max(values) * 0.3 else width * 0.9
+        label_color = 'black' if width < max(values) * 0.3 else 'white'
+        ax.text(label_x_pos, bar.get_y() + bar.get_height()/2, f'{int(width)}',
+                va='center', color=label_color)
+    
+    # Add conversion rate annotation
+    ax.annotate(f'Conversion Rate: {spec["conversion_rate"]:.2f}%',
+                xy=(0.5, 0.1), xycoords='figure fraction',
+                bbox=dict(boxstyle="round,pad=0.3", fc="yellow", alpha=0.3),
+                ha='center')
+    
+    # Set title and labels
+    ax.set_title('Conversion Funnel', fontsize=16, pad=20)
+    ax.set_xlabel('Number of Customers')
+
+def draw_action_breakdown(figure, spec):
+    """
+    Draw an actions performed bar chart on an empty figure.
+    """
+    import seaborn as sns
+    
+    ax = figure.add_subplot()
+    
+    # Create bar chart
+    bars = ax.bar(spec["actions"], spec["counts"], color=sns.color_palette("viridis", len(spec["actions"])))
+    
+    # Add data labels
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + 0.1,
+                f'{int(height)}', ha='center', va='bottom', rotation=0)
+    
+    # Set title and labels
+    ax.set_title(spec["title"], fontsize=16, pad=20)
+    ax.set_xlabel('Action Type')
+    ax.set_ylabel('Count')
+    
+    # Rotate x-axis labels for better readability
+    for label in ax.get_xticklabels():
+        label.set_rotation(45)
+        label.set_horizontalalignment('right')
+
+CHART_DRAWERS = {
+    "funnel": draw_funnel,
+    "action_breakdown": draw_action_breakdown
+}
+
+def render_chart(spec):
+    """
+    Render a chart spec to a base64 encoded PNG, or None if it fails.
+    
+    Each chart gets its own Figure on the Agg canvas, so nothing goes through
+    pyplot's global state and charts can be rendered in any process.
+    matplotlib and seaborn are only imported here, so the light chart mode
+    never loads them.
+    """
+    if spec is None:
+        return None
+    
+    import seaborn as sns
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    
+    try:
+        with sns.axes_style("whitegrid"):
+            figure = Figure(figsize=(10, 6))
+            FigureCanvasAgg(figure)
+            CHART_DRAWERS[spec["kind"]](figure, spec)
+            
+            # Adjust layout
+            figure.tight_layout()
+            
+            # Convert plot to base64 encoded image
+            buffer = BytesIO()
+            figure.savefig(buffer, format='png')
+        return base64.b64encode(buffer.getvalue()).decode('utf-8')
+    except Exception as e:
+        print(f"Error generating {spec['kind']} chart: {e}")
+        return None
+
+def chart_cache_key(spec):
+    """
+    Return the content hash identifying a chart: its kind and input data
+    (the spec) together with CHART_STYLE.
+    """
+    payload = json.dumps({"spec": spec, "style": CHART_STYLE}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def get_chart_cache_dir(paths):
+    """
+    Return the location of the chart cache inside the output directory.
+    """
+    return os.path.join(paths["output_dir"], CHART_CACHE_DIRNAME)
+
+class ChartCache:
+    """
+    On-disk cache of rendered chart images, one PNG file per chart_cache_key.
+    
+    Reading an entry refreshes its modification time; evict() removes the
+    least recently used files once the cache holds more than max_bytes.
+    """
+    __slots__ = ("cache_dir", "max_bytes", "hits", "misses")
+    
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CHART_CACHE_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+    
+    def get_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.png")
+    
+    def get(self, key):
+        """
+        Return the cached base64 image for key, or None on a miss.
+        """
+        path = self.get_path(key)
+        try:
+            with open(path, 'rb') as f:
+                image = f.read()
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        return base64.b64encode(image).decode('utf-8')
+    
+    def put(self, key, image):
+        """
+        Store a base64 image under key.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.get_path(key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(base64.b64decode(image))
+        os.replace(tmp_path, path)
+    
+    def evict(self):
+        """
+        Remove least recently used images until the cache fits max_bytes.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return
+        
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".png"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            os.remove(path)
+            total_bytes -= size
+
+def render_charts(specs, jobs=1, cache=None):
+    """
+    Render a list of chart specs, returning their images in the same order.
+    
+    Identical charts are rendered once, and with a ChartCache charts already
+    on disk are reused without touching matplotlib. When jobs is greater than
+    1 the remaining charts are spread over that many worker processes
+    (0 = one per CPU), so rendering many units scales with cores.
+    """
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    
+    # Look up each distinct chart, collecting the ones still to render
+    keys = [chart_cache_key(spec) if spec is not None else None for spec in specs]
+    images = {}
+    pending = {}
+    for key, spec in zip(keys, specs):
+        if key is None or key in images or key in pending:
+            continue
+        image = cache.get(key) if cache is not None else None
+        if image is None:
+            pending[key] = spec
+        else:
+            images[key] = image
+    
+    pending_specs = list(pending.values())
+    if jobs > 1 and len(pending_specs) > 1:
+        print(f"Rendering {len(pending_specs)} charts with {jobs} worker processes...")
+        chunksize = max(1, len(pending_specs) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            rendered = list(executor.map(render_chart, pending_specs, chunksize=chunksize))
+    else:
+        rendered = [render_chart(spec) for spec in pending_specs]
+    
+    for key, image in zip(pending, rendered):
+        images[key] = image
+        if cache is not None and image is not None:
+            cache.put(key, image)
+    
+    if cache is not None:
+        cache.evict()
+    
+    return [images.get(key) for key in keys]
+
+def chart_data_uri(image):
+    """
+    Return the data: URI embedding a base64 chart image in the page.
+    """
+    return f"data:image/png;base64,{image}"
+
+def get_chart_assets_dir(paths):
+    """
+    Return the shared chart asset directory inside the output directory.
+    """
+    return os.path.join(paths["output_dir"], CHART_ASSETS_DIRNAME)
+
+def write_chart_asset(image, assets_dir):
+    """
+    Write a base64 chart image to assets_dir as a file named by the hash of
+    its content and return its path. Identical charts share one file, which
+    is only written the first time.
+    """
+    data = base64.b64decode(image)
+    asset_path = os.path.join(assets_dir, f"{hashlib.sha256(data).hexdigest()[:20]}.png")
+    if not os.path.exists(asset_path):
+        os.makedirs(assets_dir, exist_ok=True)
+        tmp_path = asset_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, asset_path)
+    return asset_path
+
+def prune_chart_assets(assets_dir, referenced_paths):
+    """
+    Remove the chart assets in assets_dir that are not in referenced_paths,
+    i.e. that no current report links to. Returns how many were removed.
+    """
+    if not os.path.isdir(assets_dir):
+        return 0
+    
+    referenced = set(os.path.abspath(path) for path in referenced_paths)
+    removed = 0
+    for entry in os.scandir(assets_dir):
+        if entry.is_file() and entry.name.endswith(".png") and os.path.abspath(entry.path) not in referenced:
+            os.remove(entry.path)
+            removed += 1
+    return removed
+
+# Evenly spaced stops of matplotlib's viridis colormap, for SVG charts
+VIRIDIS_STOPS = ['#440154', '#472d7b', '#3b528b', '#2c728e', '#21918c', '#28ae80', '#5ec962', '#addc30', '#fde725']
+
+def viridis_colors(n):
+    """
+    Return n hex colors sampled from viridis the way seaborn's
+    color_palette("viridis", n) does, interpolating between VIRIDIS_STOPS.
+    """
+    colors = []
+    for i in range(n):
+        position = (i + 1) / (n + 1) * (len(VIRIDIS_STOPS) - 1)
+        low = min(int(position), len(VIRIDIS_STOPS) - 2)
+        fraction = position - low
+        start, end = VIRIDIS_STOPS[low], VIRIDIS_STOPS[low + 1]
+        channels = [round(int(start[k:k + 2], 16) * (1 - fraction) + int(end[k:k + 2], 16) * fraction)
+                    for k in (1, 3, 5)]
+        colors.append('#' + ''.join(f'{channel:02x}' for channel in channels))
+    return colors
+
+def funnel_svg(spec):
+    """
+    Draw a conversion funnel chart as SVG markup.
+    """
+    values = spec["values"]
+    largest = max(max(values), 1)
+    colors = ['#3498db', '#2ecc71']
+    parts = ['<text x="400" y="30" font-size="20" text-anchor="middle">Conversion Funnel</text>']
+    
+    for i, (stage, value) in enumerate(zip(spec["stages"], values)):
+        y = 60 + i * 90
+        width = value / largest * 560
+        inside = value >= largest * 0.3
+        parts.append(f'<text x="170" y="{y + 35}" font-size="13" text-anchor="end">{escape(stage)}</text>')
+        parts.append(f'<rect x="180" y="{y}" width="{width:.1f}" height="60" fill="{colors[i % len(colors)]}"/>')
+        parts.append(f'<text x="{180 + (width * 0.9 if inside else width + 4):.1f}" y="{y + 35}" font-size="13" '
+                     f'fill="{"white" if inside else "black"}" text-anchor="{"end" if inside else "start"}">'
+                     f'{value}</text>')
+    
+    parts.append(f'<text x="400" y="270" font-size="14" text-anchor="middle">'
+                 f'Conversion Rate: {spec["conversion_rate"]:.2f}%</text>')
+    return parts
+
+def action_breakdown_svg(spec):
+    """
+    Draw an actions performed bar chart as SVG markup.
+    """
+    counts = spec["counts"]
+    largest = max(max(counts, default=0), 1)
+    slot = 680 / max(len(counts), 1)
+    parts = [f'<text x="400" y="30" font-size="20" text-anchor="middle">{escape(spec["title"])}</text>']
+    
+    for i, (action, count, color) in enumerate(zip(spec["actions"], counts, viridis_colors(len(counts)))):
+        x = 100 + i * slot
+        height = count / largest * 150
+        parts.append(f'<rect x="{x + slot * 0.1:.1f}" y="{210 - height:.1f}" width="{slot * 0.8:.1f}" '
+                     f'height="{height:.1f}" fill="{color}"/>')
+        parts.append(f'<text x="{x + slot / 2:.1f}" y="{205 - height:.1f}" font-size="12" '
+                     f'text-anchor="middle">{count}</text>')
+        parts.append(f'<text x="{x + slot / 2:.1f}" y="225" font-size="12" text-anchor="end" '
+                     f'transform="rotate(-45 {x + slot / 2:.1f} 225)">{escape(action)}</text>')
+    
+    parts.append('<line x1="100" y1="210" x2="780" y2="210" stroke="#888"/>')
+    return parts
+
+SVG_DRAWERS = {
+    "funnel": funnel_svg,
+    "action_breakdown": action_breakdown_svg
+}
+
+def render_chart_svg(spec):
+    """
+    Render a chart spec as compact inline SVG markup, without matplotlib.
+    Returns None if there is no spec.
+    """
+    if spec is None:
+        return None
+    
+    parts = SVG_DRAWERS[spec["kind"]](spec)
+    return ('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 800 300" width="100%" '
+            'font-family="Arial, sans-serif">' + ''.join(parts) + '</svg>')
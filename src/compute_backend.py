@@ -0,0 +1,284 @@
+import numpy as np
+import pandas as pd
+from id_keys import id_set, KeyComparison
+
+# Compute backends selectable with --backend
+BACKEND_NAMES = ["pandas", "duckdb"]
+
+def consolidate_activity_logs(enriched_logs, group_by_columns, job_consistent_columns, sort=True,
+                              unmatched_rows=None):
+    """
+    Count actions per (customer, job, action) and attach the job-consistent
+    columns of each job's first row, in a single grouped aggregation.
+    
+    Each group records its size and the position of its first row. Missing
+    Customer and Job IDs are keys of their own, as the '' they used to be read
+    as. Rows without a customer name or action, and unmatched_rows (a boolean
+    mask of rows whose job is not in the jobs report), get groups that are not
+    counted but still take part in finding each job's first row, as the
+    previous drop_duplicates on the job keys did. The job columns are taken from those
+    rows positionally, so the wide enriched frame is never copied,
+    de-duplicated or merged. The result is sorted by Customer Name, Job ID and
+    Count (descending) unless sort is False, in which case it stays in group
+    order.
+    """
+    # Only the narrow key columns plus a row position go through the groupby
+    keys = enriched_logs[group_by_columns].assign(_row=np.arange(len(enriched_logs)))
+    grouped = keys.groupby(group_by_columns, observed=True, dropna=False)['_row'].agg(['size', 'first'])
+    
+    # Groups come out sorted by value (missing values last), so a job's groups
+    # are adjacent and its first row is the minimum over each run
+    codes = [level_codes.astype(np.int64) for level_codes in grouped.index.codes]
+    first_rows = grouped['first'].to_numpy()
+    job_rows = first_rows
+    if job_consistent_columns and len(grouped):
+        job_starts = np.flatnonzero(np.r_[True, (np.diff(codes[0]) != 0) | (np.diff(codes[1]) != 0)
+                                          | (np.diff(codes[2]) != 0)])
+        job_rows = np.repeat(np.minimum.reduceat(first_rows, job_starts),
+                             np.diff(np.r_[job_starts, len(grouped)]))
+    
+    # Groups without a customer name or action, or of unmatched rows, are not counted
+    counted = ~np.asarray(grouped.index.get_level_values(0).isna())
+    counted &= ~np.asarray(grouped.index.get_level_values(3).isna())
+    if unmatched_rows is not None:
+        counted &= ~np.asarray(unmatched_rows)[first_rows]
+    counted = np.flatnonzero(counted)
+    
+    # The level codes order like the values, so the final sort runs on
+    # integers before anything wide is built. Missing Job IDs sort first,
+    # where '' did.
+    order = counted
+    if sort:
+        job_codes = np.where(np.asarray(grouped.index.get_level_values(2).isna()), -1, codes[2])
+        order = counted[np.lexsort((-grouped['size'].to_numpy()[counted], job_codes[counted], codes[0][counted]))]
+    
+    consolidated_logs = grouped['size'].rename('Count').iloc[order].reset_index()
+    if job_consistent_columns:
+        job_data = enriched_logs[job_consistent_columns].iloc[job_rows[order]].reset_index(drop=True)
+        consolidated_logs = pd.concat([consolidated_logs, job_data], axis=1)
+    
+    return consolidated_logs
+
+class PandasBackend:
+    """
+    Joins, aggregations and key set math for the report stages, done in pandas.
+    """
+    name = "pandas"
+    supports_index = True
+    
+    def left_join(self, left, right, on, indexed_right=None):
+        """
+        Left-join right onto left by the on column, keeping left's row order.
+        indexed_right is right already indexed by on; when given the join
+        becomes an index lookup.
+        """
+        if indexed_right is not None:
+            return left.join(indexed_right, on=on, lsuffix="_x", rsuffix="_y").reset_index(drop=True)
+        return pd.merge(left, right, on=on, how="left")
+    
+    def consolidate(self, enriched_logs, group_by_columns, job_consistent_columns, sort=True,
+                    unmatched_rows=None):
+        """
+        Count actions per group and attach job-consistent columns, see
+        consolidate_activity_logs.
+        """
+        return consolidate_activity_logs(enriched_logs, group_by_columns, job_consistent_columns, sort,
+                                         unmatched_rows)
+    
+    def distinct_keys(self, keys):
+        """
+        Return the distinct values of a key column as a set.
+        """
+        return id_set(keys)
+    
+    def key_difference(self, left, right):
+        """
+        Return the distinct keys of left that do not appear in right (anti-join).
+        """
+        return id_set(left) - id_set(right)
+    
+    def key_intersection(self, left, right):
+        """
+        Return the distinct keys that appear in both left and right.
+        """
+        return id_set(left) & id_set(right)
+    
+    def compare_keys(self, left, right):
+        """
+        Return a KeyComparison of two aligned key columns, for set algebra
+        and row selection on integer codes.
+        """
+        return KeyComparison(left, right)
+
+def to_sql_column(series):
+    """
+    Convert a column to a form DuckDB compares the way pandas does:
+    categoricals become their (ordered) codes, missing values become NULL.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        return pd.array(np.where(codes < 0, None, codes), dtype="Int64")
+    return series.reset_index(drop=True)
+
+def to_sql_key(series):
+    """
+    Convert a join key column to values DuckDB can compare across tables.
+    Categoricals on the two sides may have different categories, so they are
+    compared as strings rather than codes.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(object).astype("string").reset_index(drop=True)
+    return series.reset_index(drop=True)
+
+def from_sql_value(value):
+    """
+    Map a value fetched from DuckDB back to what pandas would produce.
+    """
+    return pd.NA if value is None else value
+
+class DuckDBBackend:
+    """
+    The same operations as PandasBackend, run by the embedded DuckDB engine,
+    which is multi-threaded and can spill to disk.
+    
+    DuckDB only sees the narrow key columns plus row positions. It returns
+    which rows to take, and the wide result is assembled in pandas, so column
+    types and values are exactly those of the pandas backend.
+    """
+    name = "duckdb"
+    supports_index = False
+    
+    def __init__(self, threads=None, memory_limit=None, temp_directory=None):
+        try:
+            import duckdb
+        except ImportError:
+            raise ImportError("The duckdb backend needs the duckdb package (pip install duckdb)")
+        
+        self.connection = duckdb.connect()
+        if threads:
+            self.connection.execute(f"SET threads TO {int(threads)}")
+        if memory_limit:
+            self.connection.execute(f"SET memory_limit = '{memory_limit}'")
+        if temp_directory:
+            self.connection.execute(f"SET temp_directory = '{temp_directory}'")
+    
+    def query(self, sql, rows=False, **tables):
+        """
+        Run sql with each keyword argument registered as a table of that name.
+        Returns the result as a dict of NumPy arrays, or as a list of row tuples
+        if rows is true. Results are fetched before the tables are unregistered.
+        """
+        for table_name, table in tables.items():
+            self.connection.register(table_name, table)
+        try:
+            result = self.connection.execute(sql)
+            return result.fetchall() if rows else result.fetchnumpy()
+        finally:
+            for table_name in tables:
+                self.connection.unregister(table_name)
+    
+    def left_join(self, left, right, on, indexed_right=None):
+        """
+        Left-join right onto left by the on column with pandas merge semantics:
+        left's row order, matches in right's order, missing keys matching each
+        other and _x/_y suffixes for overlapping columns.
+        """
+        left_keys = pd.DataFrame({"k": to_sql_key(left[on]), "r": np.arange(len(left))})
+        right_keys = pd.DataFrame({"k": to_sql_key(right[on]), "r": np.arange(len(right))})
+        rows = self.query("""
+            SELECT l.r AS left_row, coalesce(r.r, -1) AS right_row
+            FROM left_keys l LEFT JOIN right_keys r ON l.k IS NOT DISTINCT FROM r.k
+            ORDER BY left_row, right_row
+        """, left_keys=left_keys, right_keys=right_keys)
+        
+        right_columns = [col for col in right.columns if col != on]
+        overlap = set(left.columns) & set(right_columns)
+        left_part = left.iloc[rows["left_row"]].reset_index(drop=True)
+        right_part = right[right_columns].reset_index(drop=True).reindex(rows["right_row"]).reset_index(drop=True)
+        left_part.columns = [f"{col}_x" if col in overlap else col for col in left_part.columns]
+        right_part.columns = [f"{col}_y" if col in overlap else col for col in right_part.columns]
+        return pd.concat([left_part, right_part], axis=1)
+    
+    def consolidate(self, enriched_logs, group_by_columns, job_consistent_columns, sort=True,
+                    unmatched_rows=None):
+        """
+        Count actions per group and attach job-consistent columns, with the
+        same result as consolidate_activity_logs.
+        """
+        keys = pd.DataFrame({f"k{i}": to_sql_column(enriched_logs[col])
+                             for i, col in enumerate(group_by_columns)})
+        keys["r"] = np.arange(len(enriched_logs))
+        keys["u"] = False if unmatched_rows is None else np.asarray(unmatched_rows, dtype=bool)
+        
+        # NULL keys group together and sort last, as in pandas' group order,
+        # except Job IDs, which sort first. Ties on name, job and count keep
+        # group order, as the stable pandas sort does.
+        order_by = ("k0, k2 NULLS FIRST, n DESC, k1 NULLS LAST, k3" if sort
+                    else "k0, k1 NULLS LAST, k2 NULLS LAST, k3")
+        groups = self.query(f"""
+            SELECT n, first_row, job_row
+            FROM (
+                SELECT k0, k1, k2, k3, count(*) AS n, min(r) AS first_row, bool_or(u) AS u,
+                       min(min(r)) OVER (PARTITION BY k0, k1, k2) AS job_row
+                FROM keys
+                GROUP BY k0, k1, k2, k3
+            )
+            WHERE k0 IS NOT NULL AND k3 IS NOT NULL AND NOT u
+            ORDER BY {order_by}
+        """, keys=keys)
+        
+        consolidated_logs = enriched_logs[group_by_columns].iloc[groups["first_row"]].reset_index(drop=True)
+        consolidated_logs['Count'] = np.asarray(groups["n"], dtype=np.int64)
+        if job_consistent_columns:
+            job_data = enriched_logs[job_consistent_columns].iloc[groups["job_row"]].reset_index(drop=True)
+            consolidated_logs = pd.concat([consolidated_logs, job_data], axis=1)
+        return consolidated_logs
+    
+    def distinct_keys(self, keys):
+        """
+        Return the distinct values of a key column as a set.
+        """
+        rows = self.query("SELECT DISTINCT k FROM keys", rows=True,
+                          keys=pd.DataFrame({"k": to_sql_key(keys)}))
+        return set(from_sql_value(row[0]) for row in rows)
+    
+    def key_difference(self, left, right):
+        """
+        Return the distinct keys of left that do not appear in right (anti-join).
+        """
+        rows = self.query("""
+            SELECT DISTINCT l.k FROM left_keys l
+            ANTI JOIN right_keys r ON l.k IS NOT DISTINCT FROM r.k
+        """, rows=True, left_keys=pd.DataFrame({"k": to_sql_key(left)}),
+            right_keys=pd.DataFrame({"k": to_sql_key(right)}))
+        return set(from_sql_value(row[0]) for row in rows)
+    
+    def key_intersection(self, left, right):
+        """
+        Return the distinct keys that appear in both left and right.
+        """
+        rows = self.query("""
+            SELECT DISTINCT l.k FROM left_keys l
+            SEMI JOIN right_keys r ON l.k IS NOT DISTINCT FROM r.k
+        """, rows=True, left_keys=pd.DataFrame({"k": to_sql_key(left)}),
+            right_keys=pd.DataFrame({"k": to_sql_key(right)}))
+        return set(from_sql_value(row[0]) for row in rows)
+    
+    def compare_keys(self, left, right):
+        """
+        Return a KeyComparison of two aligned key columns. Its presence tables
+        are built in-process, since the callers need per-row masks rather
+        than key sets and round-tripping them through DuckDB gains nothing.
+        """
+        return KeyComparison(left, right)
+
+def get_backend(name="pandas", **options):
+    """
+    Create the compute backend called name. options are passed to backends
+    that take settings (threads, memory_limit, temp_directory for duckdb).
+    """
+    if name == "pandas":
+        return PandasBackend()
+    if name == "duckdb":
+        return DuckDBBackend(**options)
+    raise ValueError(f"Unknown compute backend: {name}")
@@ -1,34 +1,527 @@
 import os
+import csv
 import glob
+import json
+import hashlib
+import datetime
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
+from table_io import INTERMEDIATE_FORMATS, write_table, write_table_chunks
+from file_manager import get_input_type
+from input_schema import apply_schema
+from work_units import build_work_unit_index
 
-def convert_excel_to_csv(paths, delimiter=',', quotechar='"', encoding='utf-8'):
+CACHE_FILENAME = ".conversion_cache.json"
+
+# Number of rows buffered at a time by the streaming converter
+STREAM_CHUNK_SIZE = 50000
+
+# Strings pandas parses as booleans when a whole column consists of them
+TRUE_STRINGS = {"True", "TRUE", "true"}
+FALSE_STRINGS = {"False", "FALSE", "false"}
+NUMERIC_KINDS = {"int", "float", "bool", "numeric_int_str", "numeric_float_str"}
+
+# Date format of datetime columns whose fractional seconds are all whole
+# milliseconds, which pandas writes with three digits. strftime has no
+# millisecond directive, so format_value handles this one itself.
+MILLISECOND_FORMAT = "%Y-%m-%d %H:%M:%S.<ms>"
+
+# Strings pandas' CSV reader treats as missing by default (pandas' own set
+# lives in a private module, so it is copied here)
+STR_NA_VALUES = {"", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+                 "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+                 "n/a", "nan", "null"}
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """
+    Compute the SHA-256 hash of a file's contents, reading it in chunks.
+    """
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def load_conversion_cache(cache_path):
+    """
+    Load the conversion cache from disk. Returns an empty cache if the file
+    is missing or unreadable.
+    """
+    if not os.path.exists(cache_path):
+        return {}
+    
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"WARNING: Could not read conversion cache '{cache_path}': {e}")
+        return {}
+
+def save_conversion_cache(cache, cache_path):
+    """
+    Write the conversion cache to disk atomically.
+    """
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, cache_path)
+
+def is_conversion_cached(cache, excel_path, csv_path, options):
+    """
+    Check whether csv_path is an up-to-date conversion of excel_path.
+    
+    Size and mtime are compared first; the content hash is only computed when
+    they differ. On a hash match the stored size/mtime are refreshed so the
+    next run takes the fast path again.
+    """
+    entry = cache.get(csv_path)
+    if entry is None or not os.path.exists(csv_path):
+        return False
+    
+    if entry.get("source") != excel_path or entry.get("options") != options:
+        return False
+    
+    stat = os.stat(excel_path)
+    if entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime:
+        return True
+    
+    if entry.get("size") != stat.st_size:
+        return False
+    
+    if entry.get("sha256") != file_sha256(excel_path):
+        return False
+    
+    entry["mtime"] = stat.st_mtime
+    return True
+
+def record_conversion(cache, excel_path, csv_path, options):
+    """
+    Store the fingerprint of excel_path as the source of csv_path.
+    """
+    stat = os.stat(excel_path)
+    cache[csv_path] = {
+        "source": excel_path,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "sha256": file_sha256(excel_path),
+        "options": options
+    }
+
+def convert_cell(cell):
+    """
+    Convert an openpyxl cell the same way pandas.read_excel does: empty cells
+    become "", error cells NaN and integral floats int.
+    """
+    if cell.value is None:
+        return ""
+    if cell.data_type == "e":
+        return np.nan
+    if cell.data_type == "n" and isinstance(cell.value, float) and cell.value.is_integer():
+        return int(cell.value)
+    return cell.value
+
+def iter_sheet_rows(excel_path):
+    """
+    Yield the converted cells of the first worksheet row by row using a
+    read-only workbook, with trailing empty cells trimmed from each row.
+    """
+    import openpyxl
+    
+    workbook = openpyxl.load_workbook(excel_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = workbook.worksheets[0]
+        sheet.reset_dimensions()
+        for row in sheet.rows:
+            values = [convert_cell(cell) for cell in row]
+            while values and values[-1] == "":
+                values.pop()
+            yield values
+    finally:
+        workbook.close()
+
+def classify_value(value):
+    """
+    Classify a converted cell value for column type inference.
+    Returns None for values pandas treats as missing.
+    """
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return None if np.isnan(value) else "float"
+    if isinstance(value, datetime.datetime):
+        return "datetime"
+    if isinstance(value, str):
+        if value in STR_NA_VALUES:
+            return None
+        if value in TRUE_STRINGS or value in FALSE_STRINGS:
+            return "bool_str"
+        try:
+            number = float(value)
+        except ValueError:
+            return "str"
+        if "_" in value:
+            return "str"
+        if number.is_integer() and value.strip().lstrip("+-").isdigit():
+            return "numeric_int_str"
+        return "numeric_float_str"
+    return "other"
+
+def profile_sheet(excel_path):
+    """
+    First streaming pass over a workbook. Works out the header, the number of
+    data rows and the dtype pandas would infer for each column, keeping only
+    a few flags per column in memory.
+    """
+    header = None
+    width = 0
+    last_row_with_data = 0
+    kinds = []
+    first_kinds = []
+    non_missing = []
+    all_midnight = []
+    has_fractions = []
+    has_microseconds = []
+    
+    for row_number, values in enumerate(iter_sheet_rows(excel_path)):
+        if values:
+            last_row_with_data = row_number
+        width = max(width, len(values))
+        
+        if row_number == 0:
+            header = values
+            continue
+        
+        while len(kinds) < len(values):
+            kinds.append(set())
+            first_kinds.append(None)
+            non_missing.append(0)
+            all_midnight.append(True)
+            has_fractions.append(False)
+            has_microseconds.append(False)
+        
+        for col, value in enumerate(values):
+            kind = classify_value(value)
+            if row_number == 1:
+                first_kinds[col] = kind
+            if kind is None:
+                continue
+            kinds[col].add(kind)
+            non_missing[col] += 1
+            if kind == "datetime":
+                if value.time() != datetime.time(0):
+                    all_midnight[col] = False
+                if value.microsecond:
+                    has_fractions[col] = True
+                if value.microsecond % 1000:
+                    has_microseconds[col] = True
+    
+    header = (header or []) + [""] * (width - len(header or []))
+    n_rows = last_row_with_data
+    
+    # Column labels, as pandas names unnamed and duplicate headers
+    columns = []
+    counts = {}
+    for i, name in enumerate(header):
+        name = f"Unnamed: {i}" if name == "" else str(name)
+        cur_count = counts.get(name, 0)
+        while cur_count > 0:
+            counts[name] = cur_count + 1
+            name = f"{name}.{cur_count}"
+            cur_count = counts.get(name, 0)
+        counts[name] = cur_count + 1
+        columns.append(name)
+    
+    # Per-column dtype following pandas' numeric/bool/datetime inference
+    column_types = []
+    date_formats = []
+    for col in range(width):
+        col_kinds = kinds[col] if col < len(kinds) else set()
+        has_missing = (non_missing[col] if col < len(non_missing) else 0) < n_rows
+        date_format = None
+        
+        if not col_kinds:
+            column_type = "float"
+        elif col_kinds == {"bool"}:
+            column_type = "float" if has_missing else "bool"
+        elif col_kinds <= NUMERIC_KINDS:
+            if has_missing or col_kinds & {"float", "numeric_float_str"}:
+                column_type = "float"
+            else:
+                column_type = "int"
+        elif col_kinds <= {"bool", "bool_str"}:
+            # pandas only parses "true"/"false" strings when the first value isn't already a bool
+            column_type = "bool" if first_kinds[col] != "bool" else "object"
+        elif col_kinds == {"datetime"}:
+            column_type = "datetime"
+            if all_midnight[col]:
+                date_format = "%Y-%m-%d"
+            elif has_microseconds[col]:
+                date_format = "%Y-%m-%d %H:%M:%S.%f"
+            elif has_fractions[col]:
+                date_format = MILLISECOND_FORMAT
+            else:
+                date_format = "%Y-%m-%d %H:%M:%S"
+        else:
+            column_type = "object"
+        
+        column_types.append(column_type)
+        date_formats.append(date_format)
+    
+    return columns, column_types, date_formats, n_rows
+
+def format_value(value, column_type, date_format):
+    """
+    Format a converted cell value as pandas.to_csv would for a column of the
+    given type. Returns "" for missing values.
+    """
+    if classify_value(value) is None:
+        return ""
+    if column_type == "int":
+        return str(int(float(value)) if isinstance(value, str) else int(value))
+    if column_type == "float":
+        return repr(float(value))
+    if column_type == "bool":
+        if isinstance(value, str):
+            return str(value in TRUE_STRINGS)
+        return str(bool(value))
+    if column_type == "datetime":
+        if date_format == MILLISECOND_FORMAT:
+            return value.strftime("%Y-%m-%d %H:%M:%S.") + f"{value.microsecond // 1000:03d}"
+        return value.strftime(date_format)
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+def iter_formatted_chunks(excel_path, column_types, date_formats, n_rows, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Second streaming pass: yield lists of at most chunk_size data rows, each
+    formatted to text column by column.
+    """
+    width = len(column_types)
+    chunk = []
+    for row_number, values in enumerate(iter_sheet_rows(excel_path)):
+        if row_number == 0:
+            continue
+        if row_number > n_rows:
+            break
+        
+        values = values + [""] * (width - len(values))
+        chunk.append([
+            format_value(value, column_types[col], date_formats[col])
+            for col, value in enumerate(values)
+        ])
+        
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    
+    if chunk:
+        yield chunk
+
+def typed_chunk(columns, column_types, rows):
+    """
+    Build a DataFrame from formatted rows using the profiled column types, so
+    every chunk written to a columnar file has the same schema.
+    """
+    data = {}
+    for col, (name, column_type) in enumerate(zip(columns, column_types)):
+        texts = [row[col] for row in rows]
+        if column_type == "int":
+            data[name] = np.array([int(text) for text in texts], dtype=np.int64)
+        elif column_type == "float":
+            data[name] = np.array([float(text) if text else np.nan for text in texts], dtype=np.float64)
+        elif column_type == "bool":
+            data[name] = pd.array([text == "True" if text else None for text in texts], dtype="boolean")
+        elif column_type == "datetime":
+            data[name] = pd.to_datetime([text if text else None for text in texts])
+        else:
+            data[name] = pd.array([text if text else None for text in texts], dtype="string")
+    return pd.DataFrame(data, columns=columns)
+
+def stream_convert_file(excel_path, csv_path, delimiter=',', quotechar='"', encoding='utf-8',
+                        output_format='csv', chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Convert a workbook without loading the whole sheet into memory.
+    
+    The sheet is read twice with a read-only reader: once to infer column
+    types, then again to write rows in chunks of chunk_size. CSV output is
+    byte-compatible with convert_file; peak memory depends on chunk_size,
+    not on the size of the sheet.
+    """
+    columns, column_types, date_formats, n_rows = profile_sheet(excel_path)
+    chunks = iter_formatted_chunks(excel_path, column_types, date_formats, n_rows, chunk_size)
+    
+    if output_format == "csv":
+        with open(csv_path, 'w', newline='', encoding=encoding) as f:
+            writer = csv.writer(f, delimiter=delimiter, quotechar=quotechar,
+                                quoting=csv.QUOTE_MINIMAL, lineterminator='\n')
+            writer.writerow(columns)
+            for chunk in chunks:
+                writer.writerows(chunk)
+    else:
+        write_table_chunks(
+            (typed_chunk(columns, column_types, chunk) for chunk in chunks),
+            csv_path,
+            output_format,
+            empty=typed_chunk(columns, column_types, [])
+        )
+    
+    return csv_path
+
+def load_excel(excel_path, input_type=None):
+    """
+    Read a workbook into a DataFrame, typed and projected by the input schema
+    for input_type when one is given.
+    """
+    df = pd.read_excel(excel_path)
+    if input_type is not None:
+        df = apply_schema(df, input_type)
+    return df
+
+def convert_file(excel_path, csv_path, delimiter=',', quotechar='"', encoding='utf-8', output_format='csv',
+                 streaming=False, input_type=None):
+    """
+    Convert a single Excel workbook to CSV (or another intermediate format).
+    Runs in worker processes when converting in parallel, so it must stay a
+    module-level function.
+    
+    Columnar formats store the dtypes from the input schema for input_type;
+    CSV is written exactly as read so it stays a plain export.
+    """
+    # Stream .xlsx workbooks in chunks when requested (.xls has no read-only reader)
+    if streaming and excel_path.lower().endswith(".xlsx"):
+        return stream_convert_file(excel_path, csv_path, delimiter, quotechar, encoding, output_format)
+    
+    # Read the Excel file
+    df = load_excel(excel_path, input_type if output_format != "csv" else None)
+    
+    # Save with specified parameters
+    write_table(df, csv_path, output_format, delimiter=delimiter, quotechar=quotechar, encoding=encoding)
+    
+    return csv_path
+
+def convert_excel_to_csv(paths, delimiter=',', quotechar='"', encoding='utf-8', use_cache=True, jobs=1,
+                         output_format='csv', streaming=False, in_memory=False, units=None):
     """
     Convert all Excel files to CSV while maintaining the person/month/report_type structure.
+    
+    units is an optional WorkUnitIndex restricting which units are converted;
+    by default every unit in paths is.
+    
+    output_format selects the intermediate format written to converted_inputs:
+    "csv" (default), or "parquet"/"feather", which keep column dtypes and
+    support loading only the needed columns. Downstream readers pick the right
+    loader from the file extension.
+    
+    When use_cache is True, workbooks whose content and conversion options are
+    unchanged since the last run reuse their existing CSV instead of being
+    parsed again.
+    
+    Raw files listed in paths["shared_raw_files"] (such as the monthly
+    total_jobs report) are converted once into their shared directory and
+    every person/report_type references that single CSV.
+    
+    When streaming is True, .xlsx workbooks are converted in fixed-size row
+    chunks with a read-only reader (see stream_convert_file) to keep memory
+    bounded on very large sheets.
+    
+    When jobs is greater than 1, the person/month/report_type tree is flattened
+    into independent conversion tasks that run in a process pool of that size
+    (0 means one worker per CPU). Results are merged back into paths in the
+    same order as a serial run.
+    
+    When in_memory is True nothing is written to converted_inputs: each
+    workbook is loaded once and converted_files holds the DataFrames
+    themselves, which the downstream stages accept in place of file paths.
     """
-    for person, person_data in paths["people"].items():
-        for month, month_data in person_data["months"].items():
-            for report_type, report_data in month_data["report_types"].items():
-                print(f"Converting files for {person} - Month {month} - Report Type: {report_type}")
-                
-                converted_dir = report_data["converted_dir"]
-                
-                # Convert each raw file for this person/month/report_type
-                for data_type, excel_path in report_data["raw_files"].items():
-                    # Create CSV filename
-                    filename = os.path.basename(excel_path)
-                    file_base = os.path.splitext(filename)[0]
-                    csv_path = os.path.join(converted_dir, file_base + ".csv")
-                    
-                    print(f"  Converting {filename} to CSV...")
-                    
-                    # Read the Excel file
-                    df = pd.read_excel(excel_path)
-                    
-                    # Save as CSV with specified parameters
-                    df.to_csv(csv_path, index=False, sep=delimiter, quotechar=quotechar, encoding=encoding)
-                    
-                    # Store the CSV path
-                    report_data["converted_files"][data_type] = csv_path
+    if output_format not in INTERMEDIATE_FORMATS:
+        raise ValueError(f"Unsupported intermediate format: {output_format}")
+    
+    options = {"delimiter": delimiter, "quotechar": quotechar, "encoding": encoding, "format": output_format}
+    extension = INTERMEDIATE_FORMATS[output_format]
+    cache_path = os.path.join(paths["converted_input_dir"], CACHE_FILENAME)
+    use_cache = use_cache and not in_memory
+    cache = load_conversion_cache(cache_path) if use_cache else {}
+    
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    
+    shared_raw_files = paths.get("shared_raw_files", {})
+    if units is None:
+        units = build_work_unit_index(paths)
+    
+    # Flatten the units into (unit, data_type, excel_path, csv_path) tasks
+    tasks = []
+    for unit in units:
+        print(f"Converting files for {unit.person} - Month {unit.month} - Report Type: {unit.report_type}")
+        
+        # Convert each raw file for this person/month/report_type
+        for data_type, excel_path in unit.raw_files.items():
+            # Shared inputs go to a single shared location instead of each person's dir
+            converted_dir = shared_raw_files.get(excel_path, unit.converted_dir)
+            
+            # Create CSV filename
+            filename = os.path.basename(excel_path)
+            file_base = os.path.splitext(filename)[0]
+            csv_path = os.path.join(converted_dir, file_base + extension)
+            tasks.append((unit, data_type, excel_path, csv_path))
+    
+    # Work out which unique files actually need converting
+    pending = []
+    seen = set()
+    for unit, data_type, excel_path, csv_path in tasks:
+        if csv_path in seen:
+            continue
+        seen.add(csv_path)
+        
+        filename = os.path.basename(excel_path)
+        input_type = get_input_type(data_type)
+        if in_memory:
+            print(f"  Loading {filename}...")
+            pending.append((excel_path, csv_path, input_type))
+        elif use_cache and is_conversion_cached(cache, excel_path, csv_path, options):
+            print(f"  {filename} unchanged, reusing cached {output_format.upper()}")
+        else:
+            print(f"  Converting {filename} to {output_format.upper()}...")
+            pending.append((excel_path, csv_path, input_type))
+    
+    # Converted file (or DataFrame when in_memory) for each target path
+    results = {}
+    if jobs > 1 and len(pending) > 1:
+        print(f"Converting {len(pending)} files with {jobs} worker processes...")
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            if in_memory:
+                futures = [
+                    executor.submit(load_excel, excel_path, input_type)
+                    for excel_path, csv_path, input_type in pending
+                ]
+            else:
+                futures = [
+                    executor.submit(convert_file, excel_path, csv_path, delimiter, quotechar, encoding,
+                                    output_format, streaming, input_type)
+                    for excel_path, csv_path, input_type in pending
+                ]
+            for (excel_path, csv_path, input_type), future in zip(pending, futures):
+                results[csv_path] = future.result()
+    else:
+        for excel_path, csv_path, input_type in pending:
+            if in_memory:
+                results[csv_path] = load_excel(excel_path, input_type)
+            else:
+                results[csv_path] = convert_file(excel_path, csv_path, delimiter, quotechar, encoding,
+                                                 output_format, streaming, input_type)
+    
+    if use_cache:
+        for excel_path, csv_path, input_type in pending:
+            record_conversion(cache, excel_path, csv_path, options)
+        save_conversion_cache(cache, cache_path)
+    
+    # Store the CSV paths in task order so the result is deterministic
+    for unit, data_type, excel_path, csv_path in tasks:
+        unit.converted_files[data_type] = results.get(csv_path, csv_path)
     
     return paths
\ No newline at end of file
@@ -14,12 +14,17 @@ def setup_paths():
     converted_input_dir = os.path.join(base_dir, "converted_inputs")
     output_dir = os.path.join(base_dir, "outputs")  # Output to project root, adjust if needed
     
+    # Inputs shared by every person (e.g. the monthly total_jobs report) are converted once here
+    shared_converted_dir = os.path.join(converted_input_dir, "_shared")
+    
     # Initialize path structure
     paths = {
         "base_dir": base_dir,
         "raw_input_dir": raw_input_dir,
         "converted_input_dir": converted_input_dir,
         "output_dir": output_dir,
+        "shared_converted_dir": shared_converted_dir,
+        "shared_raw_files": {},  # Maps shared raw file path -> converted directory
         "people": {}  # This will store paths for each person
     }
     
@@ -49,6 +54,11 @@ def scan_input_files(paths):
             month = parts[-1]
             master_job_reports[month] = excel_path
             print(f"Found master job report for month {month}: {filename}")
+            
+            # Master job reports are shared by everyone, so convert them once per month
+            shared_month_dir = os.path.join(paths["shared_converted_dir"], f"month_{month}")
+            os.makedirs(shared_month_dir, exist_ok=True)
+            paths["shared_raw_files"][excel_path] = shared_month_dir
     
     # Second pass: identify per-person files
     for excel_path in excel_files:
@@ -134,6 +144,19 @@ def scan_input_files(paths):
     
     return paths
 
+def get_input_type(data_type):
+    """
+    Map a file's data type (from its name) to the input it provides:
+    "sales_activity", "jobs_report" or "commission_isr". Returns None if unknown.
+    """
+    if "activity" in data_type:
+        return "sales_activity"
+    elif "job" in data_type or "jobs" in data_type:
+        return "jobs_report"
+    elif "sales" in data_type:
+        return "commission_isr"
+    return None
+
 def find_required_files(input_files):
     """
     Find the required files for processing based on partial name matches.
@@ -146,12 +169,9 @@ def find_required_files(input_files):
     
     # Find matching files based on partial name matches
     for data_type, file_path in input_files.items():
-        if "activity" in data_type:
-            file_mapping["sales_activity"] = file_path
-        elif "job" in data_type or "jobs" in data_type:
-            file_mapping["jobs_report"] = file_path
-        elif "sales" in data_type:
-            file_mapping["commission_isr"] = file_path
+        input_type = get_input_type(data_type)
+        if input_type:
+            file_mapping[input_type] = file_path
     
     return file_mapping
 
@@ -0,0 +1,273 @@
+import numpy as np
+import pandas as pd
+from string import Template
+
+# Table rows written to the output file per chunk
+TABLE_CHUNK_ROWS = 1000
+
+# Characters replaced in cell text, in the order html.escape replaces them
+HTML_ESCAPES = [("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;")]
+
+# Page templates are compiled once at import and filled with str values. Pages
+# are streamed to their file section by section: the head, then each chart or
+# table, then the footer, so no page is ever built up as one string.
+
+REPORT_PAGE_HEAD = Template("""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Sales Activity Report - $person - Month $month - $report_type</title>
+        <style>
+            body {
+                font-family: Arial, sans-serif;
+                line-height: 1.6;
+                color: #333;
+                max-width: 1200px;
+                margin: 0 auto;
+                padding: 20px;
+            }
+            .header {
+                text-align: center;
+                margin-bottom: 30px;
+                border-bottom: 2px solid #ddd;
+                padding-bottom: 10px;
+            }
+            .dashboard {
+                display: flex;
+                flex-wrap: wrap;
+                justify-content: space-between;
+                margin-bottom: 30px;
+            }
+            .metric-card {
+                background-color: #f8f9fa;
+                border-radius: 8px;
+                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                padding: 20px;
+                margin-bottom: 20px;
+                flex: 0 0 calc(33% - 20px);
+                text-align: center;
+            }
+            .metric-value {
+                font-size: 2em;
+                font-weight: bold;
+                color: #0066cc;
+                margin: 10px 0;
+            }
+            .metric-label {
+                font-size: 0.9em;
+                color: #666;
+            }
+            .chart-container {
+                background-color: white;
+                border-radius: 8px;
+                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                padding: 20px;
+                margin-bottom: 30px;
+            }
+            .chart-title {
+                font-size: 1.2em;
+                margin-bottom: 15px;
+                text-align: center;
+                color: #444;
+            }
+            table {
+                width: 100%;
+                border-collapse: collapse;
+                margin-bottom: 30px;
+            }
+            th, td {
+                padding: 10px;
+                border: 1px solid #ddd;
+                text-align: left;
+            }
+            th {
+                background-color: #f2f2f2;
+                font-weight: bold;
+            }
+            tr:nth-child(even) {
+                background-color: #f9f9f9;
+            }
+            .footer {
+                text-align: center;
+                font-size: 0.8em;
+                color: #888;
+                margin-top: 40px;
+                border-top: 1px solid #ddd;
+                padding-top: 10px;
+            }
+        </style>
+    </head>
+    <body>
+        <div class="header">
+            <h1>Sales Activity & Conversion Report</h1>
+            <h2>$person - Month $month - $report_type</h2>
+            <p>Generated on $generated_on</p>
+        </div>
+        
+        <div class="dashboard">
+            <div class="metric-card">
+                <div class="metric-label">Total Customers</div>
+                <div class="metric-value">$total_customers</div>
+            </div>
+            <div class="metric-card">
+                <div class="metric-label">Converted Customers</div>
+                <div class="metric-value">$all_sales_customers</div>
+            </div>
+            <div class="metric-card">
+                <div class="metric-label">Conversion Rate</div>
+                <div class="metric-value">$conversion_rate%</div>
+            </div>
+            <div class="metric-card">
+                <div class="metric-label">Customers in Both Files</div>
+                <div class="metric-value">$converted_customers</div>
+            </div>
+            <div class="metric-card">
+                <div class="metric-label">Non-Converted Customers</div>
+                <div class="metric-value">$customers_not_converted</div>
+            </div>
+            <div class="metric-card">
+                <div class="metric-label">Sales Only Customers</div>
+                <div class="metric-value">$sales_only_customers</div>
+            </div>
+        </div>
+    """)
+
+MASTER_PAGE_HEAD = Template("""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Master Sales Activity Report</title>
+        <style>
+            body {
+                font-family: Arial, sans-serif;
+                line-height: 1.6;
+                color: #333;
+                max-width: 1200px;
+                margin: 0 auto;
+                padding: 20px;
+            }
+            .header {
+                text-align: center;
+                margin-bottom: 30px;
+                border-bottom: 2px solid #ddd;
+                padding-bottom: 10px;
+            }
+            h2 {
+                color: #0066cc;
+                border-bottom: 1px solid #eee;
+                padding-bottom: 10px;
+                margin-top: 30px;
+            }
+            table {
+                width: 100%;
+                border-collapse: collapse;
+                margin-bottom: 30px;
+            }
+            th, td {
+                padding: 10px;
+                border: 1px solid #ddd;
+                text-align: left;
+            }
+            th {
+                background-color: #f2f2f2;
+                font-weight: bold;
+            }
+            tr:nth-child(even) {
+                background-color: #f9f9f9;
+            }
+            .footer {
+                text-align: center;
+                font-size: 0.8em;
+                color: #888;
+                margin-top: 40px;
+                border-top: 1px solid #ddd;
+                padding-top: 10px;
+            }
+            .report-link {
+                display: block;
+                margin: 5px 0;
+                color: #0066cc;
+                text-decoration: none;
+            }
+            .report-link:hover {
+                text-decoration: underline;
+            }
+        </style>
+    </head>
+    <body>
+        <div class="header">
+            <h1>Master Sales Activity & Conversion Report</h1>
+            <p>Generated on $generated_on</p>
+        </div>
+
+""")
+
+CHART_SECTION = Template("""
+        <div class="chart-container">
+            <div class="chart-title">$title</div>
+            $chart
+        </div>
+        """)
+
+PAGE_FOOTER = """
+        <div class="footer">
+            <p>This report was automatically generated by the Sales Activity Analysis System.</p>
+        </div>
+    </body>
+    </html>
+    """
+
+def as_text(values):
+    """
+    Convert a column (Series, array or list) to a numpy array of the
+    HTML-escaped str() of each value, with missing values as empty text.
+    """
+    values = np.asarray(values, dtype=object)
+    text = values.astype(str)
+    text[pd.isna(values)] = ""
+    for char, entity in HTML_ESCAPES:
+        if (np.char.find(text, char) >= 0).any():
+            text = np.char.replace(text, char, entity)
+    return text
+
+def concat_text(*parts):
+    """
+    Concatenate text columns and literal strings element-wise, e.g.
+    concat_text("<td>", as_text(values), "</td>").
+    """
+    result = parts[0]
+    for part in parts[1:]:
+        result = np.char.add(result, part)
+    return result
+
+def write_rows(f, rows, chunk_rows=TABLE_CHUNK_ROWS):
+    """
+    Write an array of rendered rows to f, chunk_rows at a time.
+    """
+    for start in range(0, len(rows), chunk_rows):
+        f.write("".join(rows[start:start + chunk_rows].tolist()))
+
+def write_table(f, headers, columns, heading=None):
+    """
+    Stream an HTML table to f. headers are the column titles and columns the
+    cell values, one Series/array per column; each row is assembled from
+    whole columns instead of formatting the cells one by one.
+    """
+    if heading:
+        f.write(f"""
+        <h2>{heading}</h2>""")
+    
+    f.write("""
+        <table>
+            <tr>""")
+    f.write("".join(f"<th>{header}</th>" for header in headers))
+    f.write("</tr>\n")
+    
+    if columns and len(columns[0]):
+        rows = concat_text("            <tr>",
+                           *[concat_text("<td>", as_text(column), "</td>") for column in columns],
+                           "</tr>\n")
+        write_rows(f, rows)
+    
+    f.write("""        </table>
+        """)
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+def is_whole_number_column(series):
+    """
+    Check whether every non-missing value of a numeric column is a finite
+    whole number, using a single vectorized pass over the values.
+    """
+    if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+        return False
+    
+    if pd.api.types.is_integer_dtype(series):
+        return True
+    
+    values = series.to_numpy(dtype="float64", na_value=np.nan)
+    values = values[~np.isnan(values)]
+    return bool(np.isfinite(values).all() and (np.floor(values) == values).all())
+
+def to_int_ids(series):
+    """
+    Convert a whole-number ID column (often float64 because of missing values)
+    to nullable Int64. Columns holding anything else are returned unchanged.
+    """
+    if not is_whole_number_column(series):
+        return series
+    return series.astype("Int64")
+
+def to_string_ids(series):
+    """
+    Render an ID column as stripped strings. Int64 IDs lose nothing (missing
+    values become ''), anything else is stringified as-is.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(str)
+    
+    if isinstance(series.dtype, pd.Int64Dtype):
+        result = pd.Series("", index=series.index, dtype=object, name=series.name)
+        valid = series.notna().to_numpy()
+        result[valid] = series[valid].to_numpy(dtype="int64").astype(str)
+        return result
+    
+    return series.astype(str).str.strip()
+
+def normalize_id_column(series):
+    """
+    Turn an ID column into a compact join key: nullable Int64 when every value
+    is a whole number, otherwise a categorical of the stripped string values.
+    """
+    series = to_int_ids(series)
+    if isinstance(series.dtype, (pd.Int64Dtype, pd.CategoricalDtype)):
+        return series
+    return to_string_ids(series).astype("category")
+
+def normalize_id_columns(columns):
+    """
+    Normalize several ID columns that are compared or joined with each other
+    so they end up with the same key type. If any of them is not a whole-number
+    column, all are converted to categoricals sharing one set of categories,
+    which lets pandas join and match them on their integer codes.
+    """
+    columns = [normalize_id_column(series) for series in columns]
+    if all(isinstance(series.dtype, pd.Int64Dtype) for series in columns):
+        return columns
+    
+    columns = [to_string_ids(series) for series in columns]
+    categories = sorted(set().union(*(series.dropna().unique() for series in columns)))
+    dtype = pd.CategoricalDtype(categories)
+    return [series.astype(dtype) for series in columns]
+
+def id_set(series):
+    """
+    Return the distinct values of a normalized ID column as a set of plain
+    Python values (ints or strings), suitable for printing and JSON.
+    """
+    return set(series.unique().tolist())
+
+def is_id_column_name(col):
+    """
+    Check whether a column name looks like an ID column ("Job ID", "Invoice #").
+    """
+    return 'id' in col.lower() or '#' in col
+
+def encode_key_columns(columns):
+    """
+    Map aligned key columns (see normalize_id_columns) to dense int64 codes in
+    one shared code space, missing values included as a key of their own.
+    Returns (codes, values): one code array per column, and the key of each
+    code. Categoricals reuse their codes; other columns are hashed once.
+    """
+    if all(isinstance(series.dtype, pd.CategoricalDtype) for series in columns):
+        categories = columns[0].cat.categories
+        codes = []
+        for series in columns:
+            series_codes = series.cat.codes.to_numpy().astype(np.int64)
+            series_codes[series_codes < 0] = len(categories)
+            codes.append(series_codes)
+        values = np.array(categories.tolist() + [np.nan], dtype=object)
+        return codes, values
+    
+    lengths = np.cumsum([len(series) for series in columns])[:-1]
+    all_codes, values = pd.factorize(pd.concat(columns, ignore_index=True), use_na_sentinel=False)
+    return np.split(all_codes.astype(np.int64), lengths), np.asarray(values, dtype=object)
+
+class KeyComparison:
+    """
+    Set algebra between two aligned key columns, done on integer codes.
+    
+    Each key set is a boolean presence table indexed by code, so distinct
+    counts, intersections and differences are vectorized array operations,
+    and the same tables select the matching rows of either column without
+    converting keys back into Python sets.
+    """
+    __slots__ = ("left_codes", "right_codes", "values", "left_present", "right_present")
+    
+    def __init__(self, left, right):
+        (self.left_codes, self.right_codes), self.values = encode_key_columns([left, right])
+        self.left_present = np.bincount(self.left_codes, minlength=len(self.values)) > 0
+        self.right_present = np.bincount(self.right_codes, minlength=len(self.values)) > 0
+    
+    @property
+    def both(self):
+        """
+        Presence table of the keys in both columns.
+        """
+        return self.left_present & self.right_present
+    
+    @property
+    def left_only(self):
+        """
+        Presence table of the keys only in the left column.
+        """
+        return self.left_present & ~self.right_present
+    
+    @property
+    def right_only(self):
+        """
+        Presence table of the keys only in the right column.
+        """
+        return self.right_present & ~self.left_present
+    
+    def key_values(self, present):
+        """
+        Return the keys set in a presence table as a list, in code order.
+        """
+        return self.values[present].tolist()
+    
+    def first_rows(self, side, present):
+        """
+        Return a boolean row mask of the 'left' or 'right' column selecting
+        the first row of every key set in the presence table, which is
+        .isin(keys) followed by drop_duplicates on the key column.
+        """
+        codes = self.left_codes if side == 'left' else self.right_codes
+        return present[codes] & ~pd.Series(codes).duplicated().to_numpy()
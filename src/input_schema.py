@@ -0,0 +1,159 @@
+import pandas as pd
+from table_io import read_columns, read_table, iter_table_chunks
+from id_keys import is_id_column_name, to_int_ids
+
+# Text columns (other than IDs) whose distinct values make up at most this
+# fraction of their rows are stored as categoricals, so repeated values such as
+# actions, customer names or business units cost a small integer code per row
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# Declarative description of each input data type.
+#
+# "fields" maps a logical field to the source column it is read from: the
+# first column whose name matches one of "names" (case-insensitive) or, failing
+# that, whose name contains all of "keywords". "dtype" is applied on load:
+#   "id"       - nullable Int64 when every value is a whole number, otherwise
+#                left as read (e.g. IDs with letters in them)
+#   "string"   - pandas nullable string
+#   "category" - pandas categorical
+#
+# "extra_columns" controls projection: True loads every other column as well
+# (they are carried through to the report CSVs), False loads only the schema
+# fields, and a list loads the schema fields plus those columns.
+INPUT_SCHEMAS = {
+    "sales_activity": {
+        "fields": {
+            "job_id": {"names": ["Job ID"], "keywords": ["job", "id"], "dtype": "id"},
+            "action": {"names": ["Action Performed"], "keywords": [], "dtype": "category"}
+        },
+        "extra_columns": True
+    },
+    "jobs_report": {
+        "fields": {
+            "job_id": {"names": ["Job ID"], "keywords": ["job", "id"], "dtype": "id"},
+            "customer_id": {"names": ["Customer ID"], "keywords": ["customer", "id"], "dtype": "id"},
+            "customer_name": {"names": ["Customer Name"], "keywords": ["customer", "name"], "dtype": "string"}
+        },
+        "extra_columns": True
+    },
+    "commission_isr": {
+        "fields": {
+            "job_id": {"names": ["Job ID"], "keywords": ["job", "id"], "dtype": "id"},
+            "customer_id": {"names": ["Customer ID"], "keywords": ["customer", "id"], "dtype": "id"}
+        },
+        "extra_columns": True
+    }
+}
+
+def resolve_column(columns, field_spec):
+    """
+    Find the source column for a schema field. Returns None if no column matches.
+    """
+    for name in field_spec["names"]:
+        for col in columns:
+            if str(col).lower() == name.lower():
+                return col
+    
+    if field_spec["keywords"]:
+        for col in columns:
+            if all(keyword in str(col).lower() for keyword in field_spec["keywords"]):
+                return col
+    
+    return None
+
+def resolve_schema_columns(columns, data_type):
+    """
+    Map each logical field of a data type's schema to its source column.
+    """
+    fields = INPUT_SCHEMAS[data_type]["fields"]
+    return {field: resolve_column(columns, spec) for field, spec in fields.items()}
+
+def select_columns(columns, data_type, extra_columns=None):
+    """
+    Return the columns to load for a data type, in source order, or None when
+    every column is needed.
+    """
+    if extra_columns is None:
+        extra_columns = INPUT_SCHEMAS[data_type]["extra_columns"]
+    
+    if extra_columns is True:
+        return None
+    
+    keep = set(col for col in resolve_schema_columns(columns, data_type).values() if col is not None)
+    if extra_columns:
+        keep.update(extra_columns)
+    return [col for col in columns if col in keep]
+
+def encode_categoricals(df, columns=None, max_unique_ratio=CATEGORY_MAX_UNIQUE_RATIO):
+    """
+    Convert low-cardinality text columns of df to categoricals in place.
+    ID-like columns are left alone so they can still be normalized into join
+    keys. columns limits which columns are considered (default: all).
+    """
+    for col in (df.columns if columns is None else columns):
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype) or is_id_column_name(str(col)):
+            continue
+        if not (series.dtype == object or pd.api.types.is_string_dtype(series.dtype)):
+            continue
+        if pd.api.types.infer_dtype(series, skipna=True) != "string":
+            continue
+        if series.nunique() <= max(1, len(series) * max_unique_ratio):
+            df[col] = series.astype("category")
+    return df
+
+def apply_schema(df, data_type, extra_columns=None):
+    """
+    Project a loaded DataFrame onto its schema and cast the schema fields.
+    """
+    schema = INPUT_SCHEMAS[data_type]
+    field_columns = resolve_schema_columns(df.columns, data_type)
+    
+    columns = select_columns(list(df.columns), data_type, extra_columns)
+    if columns is not None:
+        df = df[columns]
+    
+    df = df.copy(deep=False)
+    for field, col in field_columns.items():
+        if col is None:
+            continue
+        dtype = schema["fields"][field]["dtype"]
+        if dtype == "id":
+            df[col] = to_int_ids(df[col])
+        elif dtype == "string":
+            df[col] = df[col].astype("string")
+        elif dtype == "category":
+            df[col] = df[col].astype("category")
+    
+    return encode_categoricals(df)
+
+def load_input(data, data_type, extra_columns=None):
+    """
+    Load an input (file path or DataFrame) for the given data type, reading
+    only the columns its schema asks for and casting them to their dtypes.
+    """
+    if extra_columns is None:
+        extra_columns = INPUT_SCHEMAS[data_type]["extra_columns"]
+    
+    # Only read the header first when a projection is needed
+    columns = None
+    if extra_columns is not True:
+        columns = select_columns(read_columns(data), data_type, extra_columns)
+    
+    df = read_table(data, columns=columns)
+    return apply_schema(df, data_type, extra_columns=True)
+
+def iter_input_chunks(data, data_type, chunk_size, extra_columns=None):
+    """
+    Chunked version of load_input: yields the input as DataFrames of at most
+    chunk_size rows, each projected and cast according to the schema.
+    """
+    if extra_columns is None:
+        extra_columns = INPUT_SCHEMAS[data_type]["extra_columns"]
+    
+    columns = None
+    if extra_columns is not True:
+        columns = select_columns(read_columns(data), data_type, extra_columns)
+    
+    for chunk in iter_table_chunks(data, chunk_size, columns=columns):
+        yield apply_schema(chunk, data_type, extra_columns=True)
@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from input_schema import load_input
+from id_keys import is_id_column_name, normalize_id_column
+
+# Default memory budget for cached jobs reports
+DEFAULT_JOBS_CACHE_MB = 512
+
+class JobsReportCache:
+    """
+    LRU cache of loaded jobs reports.
+    
+    The month-level jobs report is the same for every person and report type,
+    so it is loaded and ID-normalized once and then shared. Entries are keyed
+    by file path (or by the DataFrame itself in in-memory mode) and evicted
+    least recently used first once their total size exceeds memory_budget
+    bytes. The most recently used report is always kept.
+    
+    Cached DataFrames are shared, so callers must not modify them in place.
+    """
+    __slots__ = ("memory_budget", "entries", "total_bytes", "hits", "misses")
+    
+    def __init__(self, memory_budget=DEFAULT_JOBS_CACHE_MB * 1024 * 1024):
+        self.memory_budget = memory_budget
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, source):
+        """
+        Return the normalized jobs report for source, loading it on first use.
+        """
+        return self.get_entry(source)["data"]
+    
+    def get_indexed(self, source, job_id_column):
+        """
+        Return the jobs report for source indexed by job_id_column, so merges
+        against it become index lookups. The index is built once per column.
+        """
+        entry = self.get_entry(source, count=False)
+        indexed = entry["indexed"].get(job_id_column)
+        if indexed is None:
+            indexed = entry["data"].set_index(job_id_column)
+            entry["indexed"][job_id_column] = indexed
+            self.resize(entry, entry["bytes"] + indexed.index.memory_usage(deep=True))
+        return indexed
+    
+    def get_entry(self, source, count=True):
+        """
+        Return the cache entry for source, loading and normalizing it on a miss.
+        count controls whether the lookup is included in the hit/miss counters.
+        """
+        key = source if isinstance(source, str) else id(source)
+        entry = self.entries.get(key)
+        if entry is not None:
+            if count:
+                self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+        
+        if count:
+            self.misses += 1
+        data = load_input(source, "jobs_report")
+        for col in data.columns:
+            if is_id_column_name(col):
+                data[col] = normalize_id_column(data[col])
+        
+        # The source is kept so an in-memory DataFrame's id stays unique
+        entry = {"source": source, "data": data, "indexed": {}, "bytes": 0}
+        self.entries[key] = entry
+        self.resize(entry, int(data.memory_usage(deep=True).sum()))
+        return entry
+    
+    def resize(self, entry, size):
+        """
+        Update an entry's size and evict old entries to stay within budget.
+        """
+        self.total_bytes += size - entry["bytes"]
+        entry["bytes"] = size
+        while self.total_bytes > self.memory_budget and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= evicted["bytes"]
+    
+    def __len__(self):
+        return len(self.entries)
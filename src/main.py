@@ -1,15 +1,39 @@
 import os
-from parser import enrich_activity_logs
+import argparse
+import importlib.util
+from parser import enrich_activity_logs, enrich_activity_logs_chunked, ENRICHED_PREVIEW_ROWS
 from excel_to_csv import convert_excel_to_csv
-from sales_validator import validate_sales_in_activity
+from sales_validator import validate_sales_in_activity, SalesValidationBatch, write_missing_sales_jobs
 from report_generator import generate_sales_conversion_report, generate_consolidated_reports
 from file_manager import find_required_files, setup_paths, scan_input_files
 from html_report_generator import generate_html_report  # Import the new module
+from html_templates import MASTER_PAGE_HEAD, PAGE_FOOTER, as_text, concat_text, write_rows, write_table
+from chart_renderer import (report_chart_specs, render_charts, ChartCache, get_chart_cache_dir,
+                            DEFAULT_CHART_CACHE_MB, chart_data_uri, get_chart_assets_dir, write_chart_asset,
+                            prune_chart_assets, render_chart_svg)
+from table_io import INTERMEDIATE_FORMATS
+from watcher import watch_directory
+from work_units import WorkUnitIndex, build_work_unit_index
+from jobs_cache import JobsReportCache, DEFAULT_JOBS_CACHE_MB
+from compute_backend import BACKEND_NAMES, get_backend
+from unit_context import UnitDataContext
+from metrics_store import MetricsStore, get_metrics_store_path
+from manifest import (get_manifest_path, load_manifest, save_manifest, get_unit_key,
+                      find_stale_units, record_unit, prune_manifest)
 from datetime import datetime
 
-def process_data_for_person_month_report_type(person, month, report_type, paths):
+def process_data_for_person_month_report_type(person, month, report_type, paths, jobs_cache=None,
+                                              enrich_chunk_size=0, backend=None, validation_batch=None,
+                                              report_requests=None):
     """
     Process data for a specific person, month, and report type.
+    jobs_cache is an optional JobsReportCache shared across units, a non-zero
+    enrich_chunk_size streams the activity log in chunks of that many rows and
+    backend is the compute backend for joins and aggregations (default: pandas).
+    When validation_batch (a SalesValidationBatch for the month) is given the
+    sales validation is queued on it instead of run for this unit alone.
+    When report_requests (a list) is given the HTML report is appended to it
+    for generate_queued_html_reports instead of generated here.
     """
     print(f"Processing data for {person} - Month {month} - Report Type: {report_type}")
     
@@ -29,10 +53,21 @@ def process_data_for_person_month_report_type(person, month, report_type, paths)
     
     # Step 1: Enrich and consolidate the activity logs
     print(f"  Enriching activity logs...")
-    enriched_logs, consolidated_logs = enrich_activity_logs(
-        file_mapping["sales_activity"], 
-        file_mapping["jobs_report"]
-    )
+    if enrich_chunk_size:
+        enriched_logs, consolidated_logs = enrich_activity_logs_chunked(
+            file_mapping["sales_activity"],
+            file_mapping["jobs_report"],
+            enrich_chunk_size,
+            jobs_cache,
+            backend
+        )
+    else:
+        enriched_logs, consolidated_logs = enrich_activity_logs(
+            file_mapping["sales_activity"],
+            file_mapping["jobs_report"],
+            jobs_cache,
+            backend
+        )
     
     # Debug info
     print("\nDEBUG: Checking for potential data issues...")
@@ -56,13 +91,23 @@ def process_data_for_person_month_report_type(person, month, report_type, paths)
     if customer_id_col:
         null_customer_ids = consolidated_logs[customer_id_col].isnull().sum()
         print(f"Null values in {customer_id_col}: {null_customer_ids}")
-        
-    # Step 2: Validate if all sales jobs are in the consolidated logs
-    print(f"  Validating sales jobs...")
-    is_complete, missing_jobs = validate_sales_in_activity(
-        consolidated_logs,  # Pass the DataFrame directly instead of the file path
-        file_mapping["commission_isr"]
-    )
+    
+    # The sales data and normalized key columns are shared by steps 2 and 3
+    context = UnitDataContext(consolidated_logs, file_mapping["commission_isr"])
+    
+    # Step 2: Validate if all sales jobs are in the consolidated logs, either
+    # now or together with the rest of the month when a batch is given
+    if validation_batch is not None:
+        print(f"  Queueing sales jobs for the month's validation...")
+        validation_batch.add(person, report_type, consolidated_logs, file_mapping["commission_isr"], context)
+    else:
+        print(f"  Validating sales jobs...")
+        is_complete, missing_jobs = validate_sales_in_activity(
+            consolidated_logs,  # Pass the DataFrame directly instead of the file path
+            file_mapping["commission_isr"],
+            backend,
+            context
+        )
     
     # Step 3: Generate sales conversion report
     print(f"  Generating sales conversion report...")
@@ -72,10 +117,24 @@ def process_data_for_person_month_report_type(person, month, report_type, paths)
         output_dir,
         person,
         month,
-        report_type
+        report_type,
+        backend,
+        context
     )
     
-    # Step 4: Generate HTML report
+    # Step 4: Generate HTML report, or queue it so its charts are rendered
+    # together with every other unit's
+    if report_requests is not None:
+        print(f"  Queueing HTML report...")
+        report_requests.append({
+            "conversion_report": conversion_report,
+            "output_dir": output_dir,
+            "detailed_data": enriched_logs.head(ENRICHED_PREVIEW_ROWS),
+            "chart_specs": report_chart_specs(conversion_report, consolidated_logs)
+        })
+        print(f"Data processing complete for {person} - Month {month} - Report Type: {report_type}")
+        return conversion_report
+    
     print(f"  Generating HTML report...")
     html_report_path = generate_html_report(
         conversion_report,
@@ -89,197 +148,274 @@ def process_data_for_person_month_report_type(person, month, report_type, paths)
     
     return conversion_report
 
+def generate_queued_html_reports(report_requests, chart_jobs=1, chart_cache=None, assets_dir=None, light=False):
+    """
+    Render the charts of every queued unit report in one batch, spread over
+    chart_jobs worker processes and reusing images in the optional
+    chart_cache, then write the units' HTML reports.
+    
+    Charts are embedded in the pages unless assets_dir is given, in which case
+    they are written there as shared content-hashed files and linked by URL.
+    With light=True they are drawn as inline SVG instead, without matplotlib.
+    
+    Each request gets the "html_report_path" it was written to, the
+    "asset_paths" its page links to and "complete", which is False when one
+    of its charts failed to render.
+    """
+    specs = [spec for request in report_requests for spec in request["chart_specs"].values()]
+    if light:
+        images = iter([render_chart_svg(spec) for spec in specs])
+    else:
+        images = iter(render_charts(specs, chart_jobs, chart_cache))
+    
+    for request in report_requests:
+        charts = {}
+        request["asset_paths"] = []
+        request["complete"] = True
+        for name, spec in request["chart_specs"].items():
+            image = next(images)
+            if not image:
+                if spec is not None:
+                    request["complete"] = False
+                continue
+            if light:
+                charts[name] = image
+            elif assets_dir is None:
+                charts[name] = chart_data_uri(image)
+            else:
+                asset_path = write_chart_asset(image, assets_dir)
+                request["asset_paths"].append(asset_path)
+                charts[name] = os.path.relpath(asset_path, request["output_dir"]).replace(os.sep, '/')
+        
+        html_report_path = generate_html_report(
+            request["conversion_report"],
+            request["output_dir"],
+            request["detailed_data"],
+            charts=charts
+        )
+        request["html_report_path"] = html_report_path
+        print(f"HTML Report available at: {html_report_path}")
+
 def generate_master_html_report(all_reports, monthly_reports, person_reports, base_output_dir):
     """
     Generate a master HTML report with overview of all data.
+    The page is streamed to the file from precompiled templates, and every
+    table is built from whole columns rather than row by row.
     """
-    # Create HTML content
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Master Sales Activity Report</title>
-        <style>
-            body {{
-                font-family: Arial, sans-serif;
-                line-height: 1.6;
-                color: #333;
-                max-width: 1200px;
-                margin: 0 auto;
-                padding: 20px;
-            }}
-            .header {{
-                text-align: center;
-                margin-bottom: 30px;
-                border-bottom: 2px solid #ddd;
-                padding-bottom: 10px;
-            }}
-            h2 {{
-                color: #0066cc;
-                border-bottom: 1px solid #eee;
-                padding-bottom: 10px;
-                margin-top: 30px;
-            }}
-            table {{
-                width: 100%;
-                border-collapse: collapse;
-                margin-bottom: 30px;
-            }}
-            th, td {{
-                padding: 10px;
-                border: 1px solid #ddd;
-                text-align: left;
-            }}
-            th {{
-                background-color: #f2f2f2;
-                font-weight: bold;
-            }}
-            tr:nth-child(even) {{
-                background-color: #f9f9f9;
-            }}
-            .footer {{
-                text-align: center;
-                font-size: 0.8em;
-                color: #888;
-                margin-top: 40px;
-                border-top: 1px solid #ddd;
-                padding-top: 10px;
-            }}
-            .report-link {{
-                display: block;
-                margin: 5px 0;
-                color: #0066cc;
-                text-decoration: none;
-            }}
-            .report-link:hover {{
-                text-decoration: underline;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h1>Master Sales Activity & Conversion Report</h1>
-            <p>Generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
-        </div>
+    html_path = os.path.join(base_output_dir, "master_report.html")
+    with open(html_path, 'w', encoding='utf-8') as f:
+        f.write(MASTER_PAGE_HEAD.substitute(generated_on=datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
         
-        <h2>Monthly Performance</h2>
-        <table>
-            <tr>
-                <th>Month</th>
-                <th>Report Type</th>
-                <th>Total Customers</th>
-                <th>Converted Customers</th>
-                <th>Conversion Rate</th>
-            </tr>
-    """
-    
-    # Add monthly data
-    for _, row in monthly_reports.iterrows():
-        html_content += f"""
-            <tr>
-                <td>{row['month']}</td>
-                <td>{row['report_type']}</td>
-                <td>{row['total_customers']}</td>
-                <td>{row['all_sales_customers']}</td>
-                <td>{row['conversion_rate']}%</td>
-            </tr>
-        """
-    
-    html_content += """
-        </table>
+        # Add monthly data
+        write_table(f, ["Month", "Report Type", "Total Customers", "Converted Customers", "Conversion Rate"], [
+            monthly_reports['month'],
+            monthly_reports['report_type'],
+            monthly_reports['total_customers'],
+            monthly_reports['all_sales_customers'],
+            concat_text(as_text(monthly_reports['conversion_rate']), "%")
+        ], heading="Monthly Performance")
         
-        <h2>Performance by Person</h2>
-        <table>
-            <tr>
-                <th>Person</th>
-                <th>Report Type</th>
-                <th>Total Customers</th>
-                <th>Converted Customers</th>
-                <th>Conversion Rate</th>
-            </tr>
-    """
-    
-    # Add person data
-    for _, row in person_reports.iterrows():
-        html_content += f"""
-            <tr>
-                <td>{row['person']}</td>
-                <td>{row['report_type']}</td>
-                <td>{row['total_customers']}</td>
-                <td>{row['all_sales_customers']}</td>
-                <td>{row['conversion_rate']}%</td>
-            </tr>
-        """
-    
-    html_content += """
-        </table>
+        # Add person data
+        write_table(f, ["Person", "Report Type", "Total Customers", "Converted Customers", "Conversion Rate"], [
+            person_reports['person'],
+            person_reports['report_type'],
+            person_reports['total_customers'],
+            person_reports['all_sales_customers'],
+            concat_text(as_text(person_reports['conversion_rate']), "%")
+        ], heading="Performance by Person")
         
-        <h2>All Reports</h2>
-        <table>
-            <tr>
-                <th>Person</th>
-                <th>Month</th>
-                <th>Report Type</th>
-                <th>Total Customers</th>
-                <th>Converted Customers</th>
-                <th>Conversion Rate</th>
-            </tr>
-    """
-    
-    # Add all report data
-    for _, row in all_reports.iterrows():
-        html_content += f"""
-            <tr>
-                <td>{row['person']}</td>
-                <td>{row['month']}</td>
-                <td>{row['report_type']}</td>
-                <td>{row['total_customers']}</td>
-                <td>{row['all_sales_customers']}</td>
-                <td>{row['conversion_rate']}%</td>
-            </tr>
-        """
-    
-    html_content += """
-        </table>
+        # Add all report data
+        write_table(f, ["Person", "Month", "Report Type", "Total Customers", "Converted Customers",
+                        "Conversion Rate"], [
+            all_reports['person'],
+            all_reports['month'],
+            all_reports['report_type'],
+            all_reports['total_customers'],
+            all_reports['all_sales_customers'],
+            concat_text(as_text(all_reports['conversion_rate']), "%")
+        ], heading="All Reports")
         
+        # Add links to individual reports
+        f.write("""
         <h2>Report Links</h2>
         <div class="report-links">
-    """
-    
-    # Add links to individual reports
-    for person in sorted(set(all_reports['person'])):
-        html_content += f"<h3>{person}</h3>"
-        person_data = all_reports[all_reports['person'] == person]
+        """)
+        for person, person_data in all_reports.groupby('person', sort=True):
+            f.write(f"<h3>{person}</h3>")
+            
+            person_name = as_text(person_data['person'])
+            month = as_text(person_data['month'])
+            report_type = as_text(person_data['report_type'])
+            report_path = concat_text("../", person_name, "/month_", month, "/", report_type, "/",
+                                      person_name, "_month_", month, "_", report_type, "_report.html")
+            write_rows(f, concat_text('\n                <a class="report-link" href="', report_path, '">\n'
+                                      '                    Month ', month, ' - ', report_type, ' Report\n'
+                                      '                </a>\n            '))
         
-        for _, row in person_data.iterrows():
-            report_file = f"{row['person']}_month_{row['month']}_{row['report_type']}_report.html"
-            report_path = os.path.join("../", row['person'], f"month_{row['month']}", row['report_type'], report_file)
-            html_content += f"""
-                <a class="report-link" href="{report_path}">
-                    Month {row['month']} - {row['report_type']} Report
-                </a>
-            """
-    
-    # Add footer
-    html_content += """
+        f.write("""
         </div>
-        
-        <div class="footer">
-            <p>This report was automatically generated by the Sales Activity Analysis System.</p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    # Write the HTML to a file
-    html_path = os.path.join(base_output_dir, "master_report.html")
-    with open(html_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+        """)
+        f.write(PAGE_FOOTER)
     
     print(f"\nMaster HTML report generated: {html_path}")
     return html_path
 
-def main():
+def parse_args(argv=None):
+    """
+    Parse command line arguments for the pipeline.
+    """
+    parser = argparse.ArgumentParser(
+        description="Run the sales activity data processing pipeline."
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes for Excel conversion (default: 1, 0 = one per CPU)"
+    )
+    parser.add_argument(
+        "--chart-jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes for rendering report charts (default: 1, 0 = one per CPU)"
+    )
+    parser.add_argument(
+        "--chart-mode",
+        choices=["inline", "assets", "light"],
+        default="inline",
+        help="Embed chart images in each HTML report, write them once to outputs/assets and link them, "
+             "or draw them as inline SVG without loading matplotlib (default: inline)"
+    )
+    parser.add_argument(
+        "--chart-cache-mb",
+        type=float,
+        default=DEFAULT_CHART_CACHE_MB,
+        help=f"Disk budget in MB for rendered charts reused across runs (default: {DEFAULT_CHART_CACHE_MB}, 0 = off)"
+    )
+    parser.add_argument(
+        "--format",
+        choices=list(INTERMEDIATE_FORMATS),
+        default="csv",
+        help="Intermediate format for converted inputs (default: csv)"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Convert .xlsx files in row chunks to bound memory on very large workbooks"
+    )
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        help="Load workbooks straight into memory instead of writing converted inputs to disk"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only reprocess units whose inputs changed since the last run (tracked in outputs/.manifest.json)"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and rebuild affected reports whenever files in raw_inputs change (implies --incremental)"
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=2.0,
+        help="Seconds without new file events before a watch-mode rebuild starts (default: 2)"
+    )
+    parser.add_argument(
+        "--watch-backend",
+        choices=["auto", "inotify", "polling"],
+        default="auto",
+        help="How watch mode detects changes (default: inotify, falling back to polling)"
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="Seconds between directory scans for the polling watch backend (default: 1)"
+    )
+    parser.add_argument(
+        "--jobs-cache-mb",
+        type=float,
+        default=DEFAULT_JOBS_CACHE_MB,
+        help=f"Memory budget in MB for jobs reports shared across people (default: {DEFAULT_JOBS_CACHE_MB})"
+    )
+    parser.add_argument(
+        "--enrich-chunk-size",
+        type=int,
+        default=0,
+        help="Stream activity logs through enrichment in chunks of this many rows (default: 0, load whole logs)"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKEND_NAMES,
+        default="pandas",
+        help="Engine for joins, aggregations and customer set math (default: pandas; duckdb needs the duckdb package)"
+    )
+    parser.add_argument(
+        "--duckdb-threads",
+        type=int,
+        default=None,
+        help="Worker threads for the duckdb backend (default: duckdb's own, one per core)"
+    )
+    parser.add_argument(
+        "--duckdb-memory-limit",
+        default=None,
+        help="Memory limit for the duckdb backend, e.g. 4GB (default: duckdb's own)"
+    )
+    
+    return parser.parse_args(argv)
+
+def update_dashboard_index(base_dir):
+    """
+    Regenerate index.html with links to the current reports using the
+    update_dashboard.py script in the project root, if present.
+    """
+    update_script = os.path.join(base_dir, 'update_dashboard.py')
+    if not os.path.exists(update_script):
+        print("Warning: update_dashboard.py not found. Skipping dashboard update.")
+        return
+    
+    try:
+        spec = importlib.util.spec_from_file_location("update_dashboard", update_script)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.main()
+    except Exception as e:
+        print(f"Error updating dashboard: {e}")
+
+def watch_and_rebuild(args):
+    """
+    Build everything once, then watch raw_inputs and rebuild only the units
+    whose inputs change, refreshing the consolidated reports and dashboard.
+    
+    A file event only triggers a run; which units it affects is decided by
+    the incremental manifest, which fingerprints every unit's inputs.
+    """
+    args.incremental = True
+    paths = setup_paths()
+    os.makedirs(paths["raw_input_dir"], exist_ok=True)
+    
+    def rebuild():
+        run_pipeline(args)
+        update_dashboard_index(paths["base_dir"])
+    
+    rebuild()
+    watch_directory(
+        paths["raw_input_dir"],
+        rebuild,
+        debounce=args.debounce,
+        poll_interval=args.poll_interval,
+        backend=args.watch_backend
+    )
+
+def run_pipeline(args):
+    """
+    Run the pipeline once: scan, convert, process each unit and build the
+    consolidated and master reports.
+    """
     print("Starting data processing pipeline...")
     
     # Initialize paths
@@ -294,26 +430,123 @@ def main():
         print("No input files found. Please check the raw_inputs directory.")
         return
     
-    # Convert Excel files to CSV
-    print("Converting Excel files to CSV...")
-    paths = convert_excel_to_csv(paths)
+    # Flat index of every person/month/report_type unit
+    units = build_work_unit_index(paths)
+    
+    # In incremental mode only units whose inputs changed are converted and processed
+    manifest = None
+    work_units = units
+    if args.incremental:
+        manifest_path = get_manifest_path(paths)
+        manifest = load_manifest(manifest_path)
+        stale_units, fingerprints = find_stale_units(units, manifest, args.chart_mode)
+        prune_manifest(manifest, fingerprints)
+        print(f"Incremental run: {len(stale_units)} of {len(units)} units need processing")
+        work_units = WorkUnitIndex(stale_units)
+    
+    # Convert Excel files to the intermediate format
+    if args.in_memory:
+        print("Loading Excel files into memory...")
+    else:
+        print(f"Converting Excel files to {args.format.upper()}...")
+    paths = convert_excel_to_csv(paths, jobs=args.jobs, output_format=args.format,
+                                 streaming=args.stream, in_memory=args.in_memory, units=work_units)
     
     # Store reports for later consolidation
     all_reports = []
     
+    # Each month's jobs report is loaded once and shared by every person
+    jobs_cache = JobsReportCache(int(args.jobs_cache_mb * 1024 * 1024))
+    backend_options = {}
+    if args.duckdb_threads:
+        backend_options['threads'] = args.duckdb_threads
+    if args.duckdb_memory_limit:
+        backend_options['memory_limit'] = args.duckdb_memory_limit
+    backend = get_backend(args.backend, **backend_options)
+    
+    # Sales validation runs once per month over all of its processed units
+    validation_batches = {}
+    
+    # HTML reports are written once all units' charts are rendered, so
+    # processed units are only recorded in the manifest after that
+    report_requests = []
+    processed_units = []
+    
+    # Per-unit results are upserted into the on-disk metrics store, which drops
+    # units whose inputs no longer exist and keeps the rollups current
+    metrics_store = MetricsStore(get_metrics_store_path(paths))
+    metrics_store.prune([(unit.person, unit.month, unit.report_type) for unit in units])
+    
     # Process data for each person, month, and report type
     print("\nBeginning data processing...")
-    for person, person_data in paths["people"].items():
-        for month, month_data in person_data["months"].items():
-            for report_type in month_data["report_types"].keys():
-                report = process_data_for_person_month_report_type(person, month, report_type, paths)
-                if report:  # If processing was successful
-                    all_reports.append(report)
+    for unit in units:
+        key = get_unit_key(unit.person, unit.month, unit.report_type)
+        
+        if work_units.get(unit.person, unit.month, unit.report_type) is None:
+            # Unchanged since the last run, reuse its cached result
+            print(f"Reusing results for {unit.person} - Month {unit.month} - Report Type: {unit.report_type}")
+            report = manifest["units"][key]["report"]
+        else:
+            if unit.month not in validation_batches:
+                validation_batches[unit.month] = SalesValidationBatch(unit.month)
+            queued = len(report_requests)
+            report = process_data_for_person_month_report_type(unit.person, unit.month, unit.report_type, paths,
+                                                               jobs_cache, args.enrich_chunk_size, backend,
+                                                               validation_batches[unit.month], report_requests)
+            request = report_requests[queued] if len(report_requests) > queued else None
+            processed_units.append((unit, key, report, request))
+        
+        if report:  # If processing was successful
+            all_reports.append(report)
+            metrics_store.upsert_report(report)
+        else:
+            metrics_store.delete_units([(unit.person, unit.month, unit.report_type)])
+    
+    for month, validation_batch in validation_batches.items():
+        print(f"\nValidating sales jobs for month {month} ({len(validation_batch.units)} units)...")
+        missing_jobs = validation_batch.validate()
+        validation_batch.print_summary(missing_jobs)
+        write_missing_sales_jobs(missing_jobs, paths["output_dir"], month, validation_batch.keys)
+    
+    if report_requests:
+        print(f"\nGenerating {len(report_requests)} HTML reports...")
+        chart_cache = None
+        if args.chart_cache_mb > 0 and args.chart_mode != "light":
+            chart_cache = ChartCache(get_chart_cache_dir(paths), int(args.chart_cache_mb * 1024 * 1024))
+        assets_dir = get_chart_assets_dir(paths) if args.chart_mode == "assets" else None
+        generate_queued_html_reports(report_requests, args.chart_jobs, chart_cache, assets_dir,
+                                     light=args.chart_mode == "light")
+        if chart_cache is not None:
+            print(f"Chart cache: {chart_cache.misses} rendered, {chart_cache.hits} reused")
+    
+    if jobs_cache.hits or jobs_cache.misses:
+        print(f"\nJobs report cache: {jobs_cache.misses} loaded, {jobs_cache.hits} reused")
+    
+    if manifest is not None:
+        for unit, key, report, request in processed_units:
+            if request is not None and not request.get("complete"):
+                # Leave it out so the next run rebuilds its report
+                print(f"WARNING: Report for {key} is incomplete, it will be rebuilt on the next run")
+                manifest["units"].pop(key, None)
+                continue
+            asset_paths = request["asset_paths"] if request is not None else []
+            record_unit(manifest, key, fingerprints[key], report, unit.output_dir, asset_paths, args.chart_mode)
+        save_manifest(manifest, manifest_path)
+    
+    # Drop chart assets no current report links to; reused units' assets are
+    # among their manifest outputs
+    referenced_paths = [path for request in report_requests for path in request.get("asset_paths", [])]
+    if manifest is not None:
+        referenced_paths += [path for entry in manifest["units"].values() for path in entry.get("outputs", [])]
+    removed = prune_chart_assets(get_chart_assets_dir(paths), referenced_paths)
+    if removed:
+        print(f"Removed {removed} unused chart assets")
     
     # Generate consolidated reports
-    if all_reports:
+    if len(metrics_store):
         print("\nGenerating consolidated reports...")
-        all_reports_df, monthly_reports, person_reports = generate_consolidated_reports(all_reports, paths["output_dir"])
+        all_reports_df, monthly_reports, person_reports = generate_consolidated_reports(all_reports, paths["output_dir"],
+                                                                                        metrics_store)
         
         # Generate master HTML report
         print("\nGenerating master HTML report...")
@@ -324,7 +557,16 @@ def main():
             paths["output_dir"]
         )
     
+    metrics_store.close()
     print("\nAll data processing complete!")
 
+def main():
+    args = parse_args()
+    
+    if args.watch:
+        watch_and_rebuild(args)
+    else:
+        run_pipeline(args)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,149 @@
+import os
+import json
+from excel_to_csv import file_sha256
+
+MANIFEST_FILENAME = ".manifest.json"
+
+# Bump when a pipeline change means cached per-unit results must be rebuilt
+MANIFEST_VERSION = 1
+
+def get_manifest_path(paths):
+    """
+    Return the location of the run manifest inside the output directory.
+    """
+    return os.path.join(paths["output_dir"], MANIFEST_FILENAME)
+
+def load_manifest(manifest_path):
+    """
+    Load the run manifest. Returns an empty manifest if the file is missing,
+    unreadable or written by an older pipeline version.
+    """
+    empty = {"version": MANIFEST_VERSION, "units": {}}
+    if not os.path.exists(manifest_path):
+        return empty
+    
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"WARNING: Could not read manifest '{manifest_path}': {e}")
+        return empty
+    
+    if manifest.get("version") != MANIFEST_VERSION:
+        print("Manifest was written by a different pipeline version, rebuilding everything")
+        return empty
+    
+    return manifest
+
+def save_manifest(manifest, manifest_path):
+    """
+    Write the run manifest to disk atomically.
+    """
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    tmp_path = manifest_path + ".tmp"
+    # Keys are not sorted so cached reports keep their column order
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+def get_unit_key(person, month, report_type):
+    """
+    Key identifying a person/month/report_type unit in the manifest.
+    """
+    return f"{person}/{month}/{report_type}"
+
+def fingerprint_file(file_path, previous=None):
+    """
+    Fingerprint a raw input by size, mtime and content hash. The hash from
+    previous is reused when size and mtime are unchanged.
+    """
+    stat = os.stat(file_path)
+    if previous and previous.get("size") == stat.st_size and previous.get("mtime") == stat.st_mtime:
+        sha256 = previous["sha256"]
+    else:
+        sha256 = file_sha256(file_path)
+    
+    return {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": sha256}
+
+def fingerprint_inputs(raw_files, previous_inputs=None):
+    """
+    Fingerprint every raw file of a unit, including the shared jobs report.
+    """
+    previous_inputs = previous_inputs or {}
+    fingerprints = {}
+    for data_type, file_path in sorted(raw_files.items()):
+        previous = previous_inputs.get(data_type)
+        if previous and previous.get("path") != file_path:
+            previous = None
+        fingerprint = fingerprint_file(file_path, previous)
+        fingerprint["path"] = file_path
+        fingerprints[data_type] = fingerprint
+    return fingerprints
+
+def inputs_match(old_inputs, new_inputs):
+    """
+    Check whether two sets of input fingerprints describe the same content.
+    """
+    if set(old_inputs) != set(new_inputs):
+        return False
+    
+    for data_type, new in new_inputs.items():
+        old = old_inputs[data_type]
+        if old.get("path") != new["path"] or old.get("sha256") != new["sha256"]:
+            return False
+    return True
+
+def find_stale_units(units, manifest, chart_mode=None):
+    """
+    Compare every WorkUnit against the manifest.
+    
+    Returns (stale_units, fingerprints): the units whose inputs changed, whose
+    outputs are missing or whose report was built with another chart_mode,
+    and the current input fingerprints of every unit keyed by manifest key.
+    """
+    stale_units = []
+    fingerprints = {}
+    for unit in units:
+        key = get_unit_key(unit.person, unit.month, unit.report_type)
+        entry = manifest["units"].get(key)
+        previous_inputs = entry["inputs"] if entry else None
+        
+        fingerprints[key] = fingerprint_inputs(unit.raw_files, previous_inputs)
+        
+        if entry is None or not inputs_match(entry["inputs"], fingerprints[key]):
+            stale_units.append(unit)
+        elif entry.get("chart_mode") != chart_mode:
+            stale_units.append(unit)
+        elif not all(os.path.exists(output_path) for output_path in entry.get("outputs", [])):
+            stale_units.append(unit)
+    
+    return stale_units, fingerprints
+
+def record_unit(manifest, key, inputs, report, output_dir, asset_paths=None, chart_mode=None):
+    """
+    Store a unit's input fingerprints, its conversion report, the chart_mode
+    of its HTML report and the output files it produced, including the
+    shared chart assets (asset_paths) the report links to.
+    """
+    outputs = []
+    if report and os.path.isdir(output_dir):
+        outputs = sorted(
+            os.path.join(output_dir, filename)
+            for filename in os.listdir(output_dir)
+            if os.path.isfile(os.path.join(output_dir, filename))
+        ) + sorted(set(asset_paths or []))
+    
+    manifest["units"][key] = {
+        "inputs": inputs,
+        "report": report,
+        "chart_mode": chart_mode,
+        "outputs": outputs
+    }
+
+def prune_manifest(manifest, keys):
+    """
+    Drop units whose inputs no longer exist so rollups only cover current data.
+    """
+    for key in list(manifest["units"]):
+        if key not in keys:
+            del manifest["units"][key]
@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import pandas as pd
+
+METRICS_STORE_FILENAME = "metrics.sqlite"
+
+# Bump when the table layout changes; older stores are rebuilt from scratch
+METRICS_STORE_VERSION = 1
+
+# Per-unit metrics in the order of generate_sales_conversion_report's result
+METRIC_COLUMNS = ["total_customers", "converted_customers", "all_sales_customers", "conversion_rate",
+                  "customers_not_converted", "sales_only_customers"]
+
+# Metrics summed by the monthly and per-person rollups
+ROLLUP_COLUMNS = ["total_customers", "converted_customers", "all_sales_customers",
+                  "customers_not_converted", "sales_only_customers"]
+
+# Rollup table name -> the unit_reports columns it groups by
+ROLLUPS = {
+    "monthly_rollup": ["month", "report_type"],
+    "person_rollup": ["person", "report_type"]
+}
+
+def get_metrics_store_path(paths):
+    """
+    Return the location of the metrics store inside the output directory.
+    """
+    return os.path.join(paths["output_dir"], METRICS_STORE_FILENAME)
+
+class MetricsStore:
+    """
+    On-disk SQLite store of every unit's conversion report plus the monthly
+    and per-person rollups built from them.
+    
+    Reports are upserted as units finish and each upsert refreshes only the
+    month and person groups it belongs to, in the same transaction, so the
+    rollups always cover every stored unit, however few of them a run
+    reprocessed.
+    """
+    __slots__ = ("db_path", "connection")
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        self.create_tables()
+    
+    def create_tables(self):
+        """
+        Create the tables, dropping those of a store with another version.
+        """
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        with self.connection:
+            if version != METRICS_STORE_VERSION:
+                for table in ["unit_reports"] + list(ROLLUPS):
+                    self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+                self.connection.execute(f"PRAGMA user_version = {METRICS_STORE_VERSION}")
+            
+            self.connection.execute(f"""
+                CREATE TABLE IF NOT EXISTS unit_reports (
+                    person TEXT NOT NULL,
+                    month TEXT NOT NULL,
+                    report_type TEXT NOT NULL,
+                    {", ".join(f"{col} {'REAL' if col == 'conversion_rate' else 'INTEGER'}"
+                               for col in METRIC_COLUMNS)},
+                    PRIMARY KEY (person, month, report_type)
+                )
+            """)
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS unit_reports_month ON unit_reports (month, report_type)")
+            
+            for table, group_columns in ROLLUPS.items():
+                self.connection.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        {", ".join(f"{col} TEXT NOT NULL" for col in group_columns)},
+                        {", ".join(f"{col} INTEGER" for col in ROLLUP_COLUMNS)},
+                        PRIMARY KEY ({", ".join(group_columns)})
+                    )
+                """)
+    
+    def upsert_report(self, report):
+        """
+        Insert or replace a unit's conversion report and refresh its rollups.
+        Returns True if the stored metrics changed.
+        """
+        unit = (report["person"], str(report["month"]), report["report_type"])
+        values = [report[col] for col in METRIC_COLUMNS]
+        with self.connection:
+            cursor = self.connection.execute(f"""
+                INSERT INTO unit_reports (person, month, report_type, {", ".join(METRIC_COLUMNS)})
+                VALUES ({", ".join("?" * (3 + len(METRIC_COLUMNS)))})
+                ON CONFLICT (person, month, report_type) DO UPDATE SET
+                    {", ".join(f"{col} = excluded.{col}" for col in METRIC_COLUMNS)}
+                WHERE {" OR ".join(f"{col} IS NOT excluded.{col}" for col in METRIC_COLUMNS)}
+            """, list(unit) + values)
+            changed = cursor.rowcount > 0
+            if changed:
+                self.refresh_rollups(*unit)
+        return changed
+    
+    def delete_units(self, units):
+        """
+        Remove the reports of units ((person, month, report_type) tuples)
+        and refresh the rollups they belonged to.
+        """
+        with self.connection:
+            for person, month, report_type in units:
+                cursor = self.connection.execute(
+                    "DELETE FROM unit_reports WHERE person = ? AND month = ? AND report_type = ?",
+                    (person, str(month), report_type))
+                if cursor.rowcount:
+                    self.refresh_rollups(person, str(month), report_type)
+    
+    def prune(self, units):
+        """
+        Remove every stored unit not in units ((person, month, report_type)
+        tuples), i.e. units whose inputs no longer exist.
+        """
+        current = set((person, str(month), report_type) for person, month, report_type in units)
+        stored = self.connection.execute("SELECT person, month, report_type FROM unit_reports").fetchall()
+        self.delete_units([unit for unit in stored if unit not in current])
+    
+    def refresh_rollups(self, person, month, report_type):
+        """
+        Recompute the monthly and per-person rollup rows a unit belongs to
+        from the stored unit reports. Runs inside the caller's transaction.
+        """
+        unit = {"person": person, "month": month, "report_type": report_type}
+        sums = ", ".join(f"SUM({col})" for col in ROLLUP_COLUMNS)
+        for table, group_columns in ROLLUPS.items():
+            where = " AND ".join(f"{col} = ?" for col in group_columns)
+            group_values = [unit[col] for col in group_columns]
+            self.connection.execute(f"DELETE FROM {table} WHERE {where}", group_values)
+            self.connection.execute(f"""
+                INSERT INTO {table}
+                SELECT {", ".join(group_columns)}, {sums} FROM unit_reports
+                WHERE {where} GROUP BY {", ".join(group_columns)}
+            """, group_values)
+    
+    def read_reports(self):
+        """
+        Return every stored unit report as a DataFrame, one row per unit.
+        """
+        return pd.read_sql_query(f"""
+            SELECT person, month, report_type, {", ".join(METRIC_COLUMNS)} FROM unit_reports
+            ORDER BY person, month, report_type
+        """, self.connection)
+    
+    def read_rollup(self, table):
+        """
+        Return a rollup table ("monthly_rollup" or "person_rollup") as a
+        DataFrame ordered by its group columns.
+        """
+        group_columns = ", ".join(ROLLUPS[table])
+        return pd.read_sql_query(f"SELECT * FROM {table} ORDER BY {group_columns}", self.connection)
+    
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM unit_reports").fetchone()[0]
+    
+    def close(self):
+        self.connection.close()
@@ -1,14 +1,19 @@
 import pandas as pd
+from input_schema import load_input, iter_input_chunks
+from id_keys import is_id_column_name, normalize_id_column, normalize_id_columns, to_string_ids
+from jobs_cache import JobsReportCache
+from compute_backend import PandasBackend
 
-def enrich_activity_logs(activity_logs_file, customer_data_file):
-    
-    # Load data files
-    activity_logs = pd.read_csv(activity_logs_file)
-    customer_data = pd.read_csv(customer_data_file)
+# Number of enriched rows returned in place of the full log by the chunked mode
+ENRICHED_PREVIEW_ROWS = 10
 
-    print(f"Activity logs contains {len(activity_logs)} entries")
-    print(f"Customer data contains {len(customer_data)} jobs")
-    
+# Partial counts are re-reduced after this many chunks to keep them small
+COMPACT_EVERY_CHUNKS = 16
+
+def find_job_id_column(activity_logs, customer_data):
+    """
+    Identify the Job ID column shared by the activity logs and customer data.
+    """
     # Identify Job ID column in both files
     job_id_column = None
     
@@ -41,68 +46,98 @@ def enrich_activity_logs(activity_logs_file, customer_data_file):
     if job_id_column not in customer_data.columns:
         raise ValueError(f"Job ID column '{job_id_column}' not found in customer data")
     
-    # Fix all ID columns by removing decimals from numeric values
+    return job_id_column
+
+def find_id_columns(activity_logs, customer_data):
+    """
+    Identify all potential ID columns in both dataframes.
+    """
     id_columns = []
-    
-    # Identify all potential ID columns in both dataframes
     for df in [activity_logs, customer_data]:
         for col in df.columns:
-            if 'id' in col.lower() or '#' in col:
+            if is_id_column_name(col):
                 if col not in id_columns:
                     id_columns.append(col)
+    return id_columns
+
+def join_customer_data(activity_logs, customer_data, customer_data_file, job_id_column, id_columns,
+                       jobs_cache=None, verbose=True, backend=None):
+    """
+    Normalize the ID columns and left-join the customer data onto the activity
+    logs by Job ID. customer_data must come from jobs_cache when one is given.
+    backend is the compute backend doing the join (default: pandas).
     
-    print(f"Fixing format for ID columns: {id_columns}")
+    Returns (enriched_logs, matched), where matched is a boolean array of the
+    rows whose job was found in the customer data.
+    """
+    if backend is None:
+        backend = PandasBackend()
     
-    # Process each ID column in each dataframe
+    # Process each ID column in each dataframe (a cached jobs report is already normalized)
     for df, name in [(activity_logs, "Activity logs"), (customer_data, "Customer data")]:
+        if df is customer_data and jobs_cache is not None:
+            continue
         for col in id_columns:
-            if col in df.columns:
-                # Check if the column appears to contain numeric values
-                if pd.api.types.is_numeric_dtype(df[col]):
-                    # Convert to integers if they're floats with .0
-                    if df[col].dropna().apply(lambda x: x == int(x)).all():
-                        df[col] = df[col].fillna(-1).astype(int).astype(str)
-                        df[col] = df[col].replace('-1', '')
-                    else:
-                        df[col] = df[col].astype(str).str.strip()
-                else:
-                    df[col] = df[col].astype(str).str.strip()
-    
-    # Print sample job IDs for debugging
-    print(f"\nSample Job IDs from activity logs: {activity_logs[job_id_column].head(3).tolist()}")
-    print(f"Sample Job IDs from customer data: {customer_data[job_id_column].head(3).tolist()}")
-    
-    # Merge the data
-    print(f"\nMerging data on column: '{job_id_column}'")
-    enriched_logs = pd.merge(
-        activity_logs,
-        customer_data,
-        on=job_id_column,
-        how="left"
-    )
+            if col in df.columns and col != job_id_column:
+                df[col] = normalize_id_column(df[col])
     
-    # Check for unmatched jobs
-    unmatched_count = 0
-    customer_id_col = next((col for col in enriched_logs.columns 
-                        if 'customer' in col.lower() and 'id' in col.lower()), None)
+    # Integer job IDs can be looked up directly in the cached, indexed jobs report
+    activity_logs[job_id_column] = normalize_id_column(activity_logs[job_id_column])
+    use_index = (jobs_cache is not None and backend.supports_index
+                 and isinstance(activity_logs[job_id_column].dtype, pd.Int64Dtype)
+                 and isinstance(customer_data[job_id_column].dtype, pd.Int64Dtype))
     
-    if customer_id_col:
-        unmatched_count = enriched_logs[customer_id_col].isna().sum()
-        if unmatched_count > 0:
-            print(f"WARNING: {unmatched_count} activity log entries couldn't be matched to a customer.")
-            # Print the unmatched Job IDs for investigation
-            unmatched_jobs = enriched_logs[enriched_logs[customer_id_col].isna()][job_id_column]
-            print(f"First few unmatched Job IDs: {unmatched_jobs.head(5).tolist()}")
-            if len(unmatched_jobs) > 5:
-                print(f"... and {len(unmatched_jobs) - 5} more")
+    if not use_index:
+        # The merge key must have the same type on both sides
+        customer_data = customer_data.copy(deep=False)
+        activity_logs[job_id_column], customer_data[job_id_column] = normalize_id_columns(
+            [activity_logs[job_id_column], customer_data[job_id_column]])
     
-    # Save the detailed enriched data
-    enriched_logs.to_csv('detailed_activity_logs.csv', index=False)
+    if verbose:
+        # Print sample job IDs for debugging
+        print(f"\nSample Job IDs from activity logs: {activity_logs[job_id_column].head(3).tolist()}")
+        print(f"Sample Job IDs from customer data: {customer_data[job_id_column].head(3).tolist()}")
+        
+        # Merge the data
+        print(f"\nMerging data on column: '{job_id_column}'")
     
-    # Identify columns that should be consistent for each job
-    # This excludes activity-specific columns that can vary within a job
-    activity_specific_columns = set(['Action Performed', 'Date', 'Time']) 
+    indexed_customer_data = None
+    if use_index:
+        indexed_customer_data = jobs_cache.get_indexed(customer_data_file, job_id_column)
     
+    matched = activity_logs[job_id_column].isin(customer_data[job_id_column]).to_numpy()
+    return backend.left_join(activity_logs, customer_data, job_id_column, indexed_customer_data), matched
+
+def find_unmatched_rows(enriched_logs, matched):
+    """
+    Return a boolean array of the enriched rows that couldn't be matched to a
+    customer: their job is not in the customer data, so they have no Customer
+    ID. Matched jobs with a blank Customer ID are not included. Returns None
+    when there is no Customer ID column to check.
+    """
+    customer_id_col = next((col for col in enriched_logs.columns 
+                        if 'customer' in col.lower() and 'id' in col.lower()), None)
+    
+    if not customer_id_col:
+        return None
+    return enriched_logs[customer_id_col].isna().to_numpy() & ~matched
+
+def print_unmatched_jobs(unmatched_count, unmatched_jobs):
+    """
+    Warn about activity log entries without a matching customer.
+    """
+    if unmatched_count > 0:
+        print(f"WARNING: {unmatched_count} activity log entries couldn't be matched to a customer.")
+        # Print the unmatched Job IDs for investigation
+        print(f"First few unmatched Job IDs: {unmatched_jobs.head(5).tolist()}")
+        if unmatched_count > 5:
+            print(f"... and {unmatched_count - 5} more")
+
+def get_grouping_columns(enriched_logs, job_id_column, verbose=True):
+    """
+    Return the columns to count actions by, adding placeholder customer
+    columns to enriched_logs when they are missing.
+    """
     # Group by customer, job ID, and action, then count
     customer_id_col = next((col for col in enriched_logs.columns 
                         if 'customer' in col.lower() and 'id' in col.lower()), None)
@@ -111,35 +146,38 @@ def enrich_activity_logs(activity_logs_file, customer_data_file):
     
     # Ensure we have the required columns for grouping
     if not customer_id_col:
-        print("WARNING: No Customer ID column found for grouping")
+        if verbose:
+            print("WARNING: No Customer ID column found for grouping")
         customer_id_col = "Customer ID"  # Use a placeholder
         enriched_logs[customer_id_col] = "Unknown"
     
     if not customer_name_col:
-        print("WARNING: No Customer Name column found for grouping")
+        if verbose:
+            print("WARNING: No Customer Name column found for grouping")
         customer_name_col = "Customer Name"  # Use a placeholder
         enriched_logs[customer_name_col] = "Unknown"
     
     # Define the grouping columns
-    group_by_columns = [customer_name_col, customer_id_col, job_id_column, 'Action Performed']
-    
-    print(f"\nGrouping by: {group_by_columns}")
-    
-    # Count actions
-    action_counts = enriched_logs.groupby(group_by_columns).size().reset_index(name='Count')
-    
-    # Get one row per job with all consistent info
-    job_columns = [job_id_column]
-    job_consistent_columns = [col for col in enriched_logs.columns 
-                            if col not in activity_specific_columns 
-                            and col not in group_by_columns]
+    return [customer_name_col, customer_id_col, job_id_column, 'Action Performed']
+
+def get_job_consistent_columns(enriched_logs, group_by_columns):
+    """
+    Identify columns that should be consistent for each job. This excludes
+    activity-specific columns that can vary within a job.
+    """
+    activity_specific_columns = set(['Action Performed', 'Date', 'Time'])
     
+    return [col for col in enriched_logs.columns
+            if col not in activity_specific_columns
+            and col not in group_by_columns]
+
+def merge_job_data(action_counts, job_data, group_by_columns):
+    """
+    Attach the representative job row to each action count and sort by
+    Customer Name, Job ID, and Count (descending).
+    """
     # Merge action counts with job data
-    if job_consistent_columns:
-        # Get a representative row for each job
-        job_data = enriched_logs[group_by_columns[:3] + job_consistent_columns].drop_duplicates(
-            subset=group_by_columns[:3])
-        
+    if job_data is not None:
         # Merge with action counts
         consolidated_logs = pd.merge(
             action_counts, 
@@ -150,11 +188,61 @@ def enrich_activity_logs(activity_logs_file, customer_data_file):
     else:
         consolidated_logs = action_counts
     
-    # Sort by Customer Name, Job ID, and Count (descending)
-    consolidated_logs = consolidated_logs.sort_values(
-        [customer_name_col, job_id_column, 'Count'], 
-        ascending=[True, True, False]
+    return sort_consolidated_logs(consolidated_logs, group_by_columns)
+
+def sort_consolidated_logs(consolidated_logs, group_by_columns):
+    """
+    Sort by Customer Name, Job ID, and Count (descending). Missing Job IDs
+    sort first, where '' did.
+    """
+    return consolidated_logs.sort_values(
+        [group_by_columns[0], group_by_columns[2], 'Count'],
+        ascending=[True, True, False],
+        na_position='first'
     )
+
+def enrich_activity_logs(activity_logs_file, customer_data_file, jobs_cache=None, backend=None):
+    if backend is None:
+        backend = PandasBackend()
+    
+    # Load data files. With a JobsReportCache the jobs report is shared with
+    # other people for the same month and already has its IDs normalized.
+    activity_logs = load_input(activity_logs_file, "sales_activity")
+    if jobs_cache is not None:
+        customer_data = jobs_cache.get(customer_data_file)
+    else:
+        customer_data = load_input(customer_data_file, "jobs_report")
+    
+    print(f"Activity logs contains {len(activity_logs)} entries")
+    print(f"Customer data contains {len(customer_data)} jobs")
+    
+    job_id_column = find_job_id_column(activity_logs, customer_data)
+    
+    # Fix all ID columns by removing decimals from numeric values
+    id_columns = find_id_columns(activity_logs, customer_data)
+    
+    print(f"Fixing format for ID columns: {id_columns}")
+    
+    enriched_logs, matched = join_customer_data(activity_logs, customer_data, customer_data_file,
+                                                job_id_column, id_columns, jobs_cache, backend=backend)
+    
+    # Check for unmatched jobs
+    unmatched_rows = find_unmatched_rows(enriched_logs, matched)
+    if unmatched_rows is not None:
+        unmatched_jobs = enriched_logs[job_id_column][unmatched_rows]
+        print_unmatched_jobs(len(unmatched_jobs), unmatched_jobs)
+    
+    # Save the detailed enriched data
+    enriched_logs.to_csv('detailed_activity_logs.csv', index=False)
+    
+    group_by_columns = get_grouping_columns(enriched_logs, job_id_column)
+    
+    print(f"\nGrouping by: {group_by_columns}")
+    
+    # Count actions and get one row per job with all consistent info
+    job_consistent_columns = get_job_consistent_columns(enriched_logs, group_by_columns)
+    consolidated_logs = backend.consolidate(enriched_logs, group_by_columns, job_consistent_columns,
+                                            unmatched_rows=unmatched_rows)
     
     # Save the consolidated data
     consolidated_logs.to_csv('consolidated_activity_logs.csv', index=False)
@@ -162,4 +250,121 @@ def enrich_activity_logs(activity_logs_file, customer_data_file):
     print(f"\nEnriched logs shape: {enriched_logs.shape}")
     print(f"Consolidated logs shape: {consolidated_logs.shape}")
     
-    return enriched_logs, consolidated_logs
\ No newline at end of file
+    return enriched_logs, consolidated_logs
+
+def align_key_parts(parts, columns):
+    """
+    Give each key column the same type in every partial result. Chunks decide
+    their ID types independently, so if some chunks have integer IDs and
+    others do not, all of them fall back to strings as a full load would.
+    """
+    for col in columns:
+        dtypes = set(isinstance(part[col].dtype, pd.Int64Dtype) for part in parts)
+        if len(dtypes) > 1:
+            for part in parts:
+                part[col] = to_string_ids(part[col])
+    return parts
+
+def reduce_action_counts(count_parts, job_parts, group_by_columns):
+    """
+    Combine partial action counts and representative job rows from several
+    chunks into one of each.
+    """
+    count_parts = align_key_parts(count_parts, group_by_columns[:3])
+    action_counts = pd.concat(count_parts, ignore_index=True).groupby(
+        group_by_columns, observed=True, dropna=False)['Count'].sum().reset_index()
+    action_counts['Action Performed'] = action_counts['Action Performed'].astype("category")
+    
+    job_data = None
+    if job_parts:
+        job_parts = align_key_parts(job_parts, group_by_columns[:3])
+        job_data = pd.concat(job_parts, ignore_index=True).drop_duplicates(subset=group_by_columns[:3])
+    
+    return action_counts, job_data
+
+def enrich_activity_logs_chunked(activity_logs_file, customer_data_file, chunk_size, jobs_cache=None,
+                                 backend=None):
+    """
+    Streaming version of enrich_activity_logs for activity logs too large to
+    hold in memory. The activity log is read chunk_size rows at a time; each
+    chunk is joined against the jobs report, appended to the detailed output
+    and reduced to partial (customer, job, action) counts that are merged at
+    the end, so the consolidated output is the same as enrich_activity_logs.
+    
+    Returns (enriched_preview, consolidated_logs), where enriched_preview
+    holds only the first rows of the enriched logs. backend does the per-chunk
+    joins; the partial counts are always combined in pandas.
+    """
+    # The jobs report is small enough to keep whole, indexed by Job ID
+    if jobs_cache is None:
+        jobs_cache = JobsReportCache()
+    customer_data = jobs_cache.get(customer_data_file)
+    print(f"Customer data contains {len(customer_data)} jobs")
+    print(f"Streaming activity logs in chunks of {chunk_size} rows")
+    
+    total_rows = 0
+    unmatched_count = 0
+    unmatched_jobs = []
+    count_parts = []
+    job_parts = []
+    enriched_preview = None
+    
+    for chunk in iter_input_chunks(activity_logs_file, "sales_activity", chunk_size):
+        first = enriched_preview is None
+        if first:
+            job_id_column = find_job_id_column(chunk, customer_data)
+            id_columns = find_id_columns(chunk, customer_data)
+            print(f"Fixing format for ID columns: {id_columns}")
+        
+        enriched_logs, matched = join_customer_data(chunk, customer_data, customer_data_file, job_id_column,
+                                                    id_columns, jobs_cache, verbose=first, backend=backend)
+        total_rows += len(enriched_logs)
+        
+        # Check for unmatched jobs
+        unmatched_rows = find_unmatched_rows(enriched_logs, matched)
+        chunk_unmatched = enriched_logs[job_id_column][unmatched_rows] if unmatched_rows is not None else None
+        if chunk_unmatched is not None and len(chunk_unmatched) > 0:
+            unmatched_count += len(chunk_unmatched)
+            if len(unmatched_jobs) < 5:
+                unmatched_jobs.extend(chunk_unmatched.head(5 - len(unmatched_jobs)).tolist())
+        
+        # Append to the detailed enriched data
+        enriched_logs.to_csv('detailed_activity_logs.csv', index=False,
+                             mode='w' if first else 'a', header=first)
+        
+        group_by_columns = get_grouping_columns(enriched_logs, job_id_column, verbose=first)
+        if first:
+            print(f"\nGrouping by: {group_by_columns}")
+            enriched_preview = enriched_logs.head(ENRICHED_PREVIEW_ROWS).copy()
+            job_consistent_columns = get_job_consistent_columns(enriched_logs, group_by_columns)
+        
+        # Count actions and keep the first row of each job seen in this chunk.
+        # Missing IDs are keys of their own; rows without a customer name or
+        # action, or matched to no job, are not counted.
+        counted = enriched_logs[group_by_columns[0]].notna() & enriched_logs['Action Performed'].notna()
+        if unmatched_rows is not None:
+            counted &= ~unmatched_rows
+        count_parts.append(enriched_logs[group_by_columns][counted].groupby(
+            group_by_columns, observed=True, dropna=False).size().reset_index(name='Count'))
+        if job_consistent_columns:
+            job_parts.append(enriched_logs[group_by_columns[:3] + job_consistent_columns].drop_duplicates(
+                subset=group_by_columns[:3]))
+        
+        if len(count_parts) >= COMPACT_EVERY_CHUNKS:
+            action_counts, job_data = reduce_action_counts(count_parts, job_parts, group_by_columns)
+            count_parts = [action_counts]
+            job_parts = [job_data] if job_data is not None else []
+    
+    print(f"Activity logs contains {total_rows} entries")
+    print_unmatched_jobs(unmatched_count, pd.Series(unmatched_jobs, dtype=object))
+    
+    action_counts, job_data = reduce_action_counts(count_parts, job_parts, group_by_columns)
+    consolidated_logs = merge_job_data(action_counts, job_data, group_by_columns)
+    
+    # Save the consolidated data
+    consolidated_logs.to_csv('consolidated_activity_logs.csv', index=False)
+    
+    print(f"\nEnriched logs shape: ({total_rows}, {len(enriched_preview.columns)})")
+    print(f"Consolidated logs shape: {consolidated_logs.shape}")
+    
+    return enriched_preview, consolidated_logs
\ No newline at end of file
@@ -1,58 +1,37 @@
 import os
 import pandas as pd
+from input_schema import encode_categoricals
+from compute_backend import PandasBackend
+from unit_context import UnitDataContext
 
-def generate_sales_conversion_report(consolidated_data, sales_file, output_dir=None, person=None, month=None, report_type=None):
+def generate_sales_conversion_report(consolidated_data, sales_file, output_dir=None, person=None, month=None, report_type=None,
+                                     backend=None, context=None):
     """
     Generate a report analyzing the conversion rate of customers.
     Consider all customers in the sales file as converted.
+    backend is the compute backend for the customer set math (default: pandas).
+    context is the work unit's UnitDataContext shared with the validation stage.
     """
-    # Load the files
-    if isinstance(consolidated_data, str):
-        consolidated_data = pd.read_csv(consolidated_data)
+    if backend is None:
+        backend = PandasBackend()
+    
+    if context is None:
+        context = UnitDataContext(consolidated_data, sales_file)
     
-    sales_data = pd.read_csv(sales_file)
+    # Load the files
+    consolidated_data = context.consolidated_data
+    sales_data = context.sales_data
     
     # Print column names to verify
     print("Columns in consolidated file:", consolidated_data.columns.tolist())
     print("Columns in sales file:", sales_data.columns.tolist())
     
-    # Find Job ID columns in both files
-    job_id_columns = {
-        'consolidated': None,
-        'sales': None
-    }
-    
-    # Customer ID columns in both files
-    customer_id_columns = {
-        'consolidated': None,
-        'sales': None
-    }
-    
-    # Find column names in both files
-    for file_type, df in [('consolidated', consolidated_data), ('sales', sales_data)]:
-        # Find Job ID column
-        for col in df.columns:
-            if col.lower() == 'job id':
-                job_id_columns[file_type] = col
-                break
-        
-        if job_id_columns[file_type] is None:
-            possible_cols = [col for col in df.columns 
-                            if 'job' in col.lower() and 'id' in col.lower()]
-            if possible_cols:
-                job_id_columns[file_type] = possible_cols[0]
-        
-        # Find Customer ID column
-        for col in df.columns:
-            if 'customer' in col.lower() and 'id' in col.lower():
-                customer_id_columns[file_type] = col
-                break
-        
-        if customer_id_columns[file_type] is None:
-            possible_cols = [col for col in df.columns 
-                            if 'customer' in col.lower()]
-            if possible_cols:
-                customer_id_columns[file_type] = possible_cols[0]
+    # Find Job ID and Customer ID columns in both files
+    job_id_columns = {}
+    customer_id_columns = {}
+    for file_type in ['consolidated', 'sales']:
+        job_id_columns[file_type] = context.find_key_column(file_type, 'job_id')
+        customer_id_columns[file_type] = context.find_key_column(file_type, 'customer_id')
     
     # Verify we found all necessary columns
     if not job_id_columns['consolidated'] or not customer_id_columns['consolidated']:
@@ -72,31 +51,10 @@ def generate_sales_conversion_report(consolidated_data, sales_file, output_dir=N
     print(f"Using '{job_id_columns['sales']}' as Job ID column in sales file")
     print(f"Using '{customer_id_columns['sales']}' as Customer ID column in sales file")
     
-    # Fix all ID columns in both DataFrames
-    for file_type, df in [('consolidated', consolidated_data), ('sales', sales_data)]:
-        # Process Job ID column
-        col = job_id_columns[file_type]
-        if pd.api.types.is_numeric_dtype(df[col]):
-            # If all values are integers (no decimal part)
-            if df[col].dropna().apply(lambda x: x == int(x)).all():
-                df[col] = df[col].fillna(-1).astype(int).astype(str)
-                df[col] = df[col].replace('-1', '')
-            else:
-                df[col] = df[col].astype(str).str.strip()
-        else:
-            df[col] = df[col].astype(str).str.strip()
-        
-        # Process Customer ID column
-        col = customer_id_columns[file_type]
-        if pd.api.types.is_numeric_dtype(df[col]):
-            # If all values are integers (no decimal part)
-            if df[col].dropna().apply(lambda x: x == int(x)).all():
-                df[col] = df[col].fillna(-1).astype(int).astype(str)
-                df[col] = df[col].replace('-1', '')
-            else:
-                df[col] = df[col].astype(str).str.strip()
-        else:
-            df[col] = df[col].astype(str).str.strip()
+    # Bring the ID columns of both DataFrames to the same compact key types
+    # (a no-op for keys the validation stage already normalized)
+    context.get_keys('job_id')
+    consolidated_customer_ids, sales_customer_ids = context.get_keys('customer_id')
     
     # Display sample job IDs and customer IDs from both files for debugging
     print("\nSample data from consolidated file:")
@@ -107,29 +65,31 @@ def generate_sales_conversion_report(consolidated_data, sales_file, output_dir=N
     print("Job IDs:", sales_data[job_id_columns['sales']].head(3).tolist())
     print("Customer IDs:", sales_data[customer_id_columns['sales']].head(3).tolist())
     
-    # Get unique Customer IDs from both files
-    consolidated_customers = set(consolidated_data[customer_id_columns['consolidated']].unique())
-    sales_customers = set(sales_data[customer_id_columns['sales']].unique())
-
-    print(f"\nUnique Customers in Consolidated file: {len(consolidated_customers)}")
-    print(f"Unique Customers in Sales File: {len(sales_customers)}")
+    # Compare the customers of both files on integer key codes
+    customers = backend.compare_keys(consolidated_customer_ids, sales_customer_ids)
+    
+    consolidated_customers = int(customers.left_present.sum())
+    sales_customers = int(customers.right_present.sum())
+    
+    print(f"\nUnique Customers in Consolidated file: {consolidated_customers}")
+    print(f"Unique Customers in Sales File: {sales_customers}")
     
     # FIXED: All customers in sales file made a purchase
     # Consider all sales customers as converted
     # We'll still find the matching customers to identify which consolidated customers converted
-    matching_customers = sales_customers.intersection(consolidated_customers)
+    matching_customers = customers.both
     
     # Consider customers who appear in the sales file but not in consolidated data
-    sales_only_customers = sales_customers - consolidated_customers
-    if sales_only_customers:
-        print(f"WARNING: {len(sales_only_customers)} customers in sales file do not appear in activity logs")
-        if len(sales_only_customers) > 0:
-            print(f"Sample customers only in sales file: {list(sales_only_customers)[:3]}")
+    sales_only_customers = customers.right_only
+    sales_only_count = int(sales_only_customers.sum())
+    if sales_only_count:
+        print(f"WARNING: {sales_only_count} customers in sales file do not appear in activity logs")
+        print(f"Sample customers only in sales file: {customers.key_values(sales_only_customers)[:3]}")
     
     # Calculate metrics
-    total_customers = len(consolidated_customers)
-    converted_customers = len(matching_customers)  # These are customers that appear in both files
-    all_sold_customers = len(sales_customers)  # All customers who made a purchase
+    total_customers = consolidated_customers
+    converted_customers = int(matching_customers.sum())  # These are customers that appear in both files
+    all_sold_customers = sales_customers  # All customers who made a purchase
     
     # FIXED: Calculate conversion rate based on ALL customers in sales file
     # This includes both matching customers and sales-only customers
@@ -153,18 +113,16 @@ def generate_sales_conversion_report(consolidated_data, sales_file, output_dir=N
     print(f"Total customers who made a purchase (all sales): {all_sold_customers}")
     print(f"Conversion rate (all sales / all customers): {conversion_rate:.2f}%")
     print(f"Customers who did not convert: {total_customers - converted_customers}")
-    print(f"Sales customers not in activity logs: {len(sales_only_customers)}")
+    print(f"Sales customers not in activity logs: {sales_only_count}")
     
     # Only save files if output directory is specified
     if output_dir:
         # Generate a detailed CSV report
         # List of customers in consolidated but not in sales (non-converted)
-        non_converted = consolidated_customers - sales_customers
-        if non_converted:
-            # Get records for non-converted customers
-            non_converted_data = consolidated_data[
-                consolidated_data[customer_id_columns['consolidated']].isin(non_converted)
-            ].drop_duplicates(subset=[customer_id_columns['consolidated']])
+        non_converted = customers.left_only
+        if non_converted.any():
+            # Get the first record of each non-converted customer
+            non_converted_data = consolidated_data[customers.first_rows('left', non_converted)]
             
             # Save to CSV
             non_converted_path = os.path.join(output_dir, f"{report_prefix}non_converted_customers.csv")
@@ -173,10 +131,8 @@ def generate_sales_conversion_report(consolidated_data, sales_file, output_dir=N
         
         # List of customers in sales that are also in consolidated (converted)
         if converted_customers > 0:
-            # Get records for converted customers
-            converted_data = consolidated_data[
-                consolidated_data[customer_id_columns['consolidated']].isin(matching_customers)
-            ].drop_duplicates(subset=[customer_id_columns['consolidated']])
+            # Get the first record of each converted customer
+            converted_data = consolidated_data[customers.first_rows('left', matching_customers)]
             
             # Save to CSV
             converted_path = os.path.join(output_dir, f"{report_prefix}converted_customers.csv")
@@ -184,10 +140,8 @@ def generate_sales_conversion_report(consolidated_data, sales_file, output_dir=N
             print(f"Details of converted customers saved to '{converted_path}'")
         
         # For sales customers not in activity logs, save them separately
-        if sales_only_customers:
-            sales_only_data = sales_data[
-                sales_data[customer_id_columns['sales']].isin(sales_only_customers)
-            ].drop_duplicates(subset=[customer_id_columns['sales']])
+        if sales_only_count:
+            sales_only_data = sales_data[customers.first_rows('right', sales_only_customers)]
             
             sales_only_path = os.path.join(output_dir, f"{report_prefix}sales_only_customers.csv")
             sales_only_data.to_csv(sales_only_path, index=False)
@@ -203,7 +157,7 @@ def generate_sales_conversion_report(consolidated_data, sales_file, output_dir=N
             "All_Sales_Customers": all_sold_customers,
             "Conversion_Rate": round(conversion_rate, 2),
             "Non_Converted_Customers": total_customers - converted_customers,
-            "Sales_Only_Customers": len(sales_only_customers)
+            "Sales_Only_Customers": sales_only_count
         }])
         
         report_path = os.path.join(output_dir, f"{report_prefix}sales_conversion_report.csv")
@@ -219,10 +173,10 @@ def generate_sales_conversion_report(consolidated_data, sales_file, output_dir=N
         "all_sales_customers": all_sold_customers,
         "conversion_rate": conversion_rate,
         "customers_not_converted": total_customers - converted_customers,
-        "sales_only_customers": len(sales_only_customers)
+        "sales_only_customers": sales_only_count
     }
 
-def generate_consolidated_reports(all_person_reports, base_output_dir):
+def generate_consolidated_reports(all_person_reports, base_output_dir, metrics_store=None):
     """
     Create consolidated reports across all people, months, and report types.
     
@@ -231,27 +185,51 @@ def generate_consolidated_reports(all_person_reports, base_output_dir):
         List of dictionaries containing report data from generate_sales_conversion_report
     base_output_dir : str
         Base directory to save consolidated reports
+    metrics_store : MetricsStore, optional
+        Store the per-unit reports were upserted into. When given, the reports
+        and the monthly and per-person rollups are read from it instead of
+        all_person_reports, so they also cover units this run did not process.
     """
-    if not all_person_reports:
+    if metrics_store is not None:
+        all_reports_df = metrics_store.read_reports()
+    else:
+        all_reports_df = pd.DataFrame(all_person_reports)
+    
+    if all_reports_df.empty:
         print("No reports to consolidate.")
         return
     
-    # Create a DataFrame from all reports
-    all_reports_df = pd.DataFrame(all_person_reports)
-    
     # Save the consolidated report
     consolidated_path = os.path.join(base_output_dir, "consolidated_sales_report.csv")
     all_reports_df.to_csv(consolidated_path, index=False)
     print(f"\nConsolidated report for all people and months saved to '{consolidated_path}'")
     
-    # Create monthly reports (aggregate by month)
-    monthly_reports = all_reports_df.groupby(['month', 'report_type']).agg({
-        'total_customers': 'sum',
-        'converted_customers': 'sum',
-        'all_sales_customers': 'sum',
-        'customers_not_converted': 'sum',
-        'sales_only_customers': 'sum'
-    }).reset_index()
+    if metrics_store is not None:
+        # The store keeps the rollups up to date as reports are upserted
+        monthly_reports = metrics_store.read_rollup("monthly_rollup")
+        person_reports = metrics_store.read_rollup("person_rollup")
+    else:
+        # Group keys repeat on every row, so group on categoricals
+        grouped_reports_df = encode_categoricals(all_reports_df.copy(deep=False), columns=['person', 'report_type'],
+                                                 max_unique_ratio=1)
+        
+        # Create monthly reports (aggregate by month)
+        monthly_reports = grouped_reports_df.groupby(['month', 'report_type'], observed=True).agg({
+            'total_customers': 'sum',
+            'converted_customers': 'sum',
+            'all_sales_customers': 'sum',
+            'customers_not_converted': 'sum',
+            'sales_only_customers': 'sum'
+        }).reset_index()
+        
+        # Create per-person reports (aggregate by person)
+        person_reports = grouped_reports_df.groupby(['person', 'report_type'], observed=True).agg({
+            'total_customers': 'sum',
+            'converted_customers': 'sum',
+            'all_sales_customers': 'sum',
+            'customers_not_converted': 'sum',
+            'sales_only_customers': 'sum'
+        }).reset_index()
     
     # Calculate conversion rates for each month - based on all sales customers
     monthly_reports['conversion_rate'] = (monthly_reports['all_sales_customers'] / 
@@ -262,15 +240,6 @@ def generate_consolidated_reports(all_person_reports, base_output_dir):
     monthly_reports.to_csv(monthly_path, index=False)
     print(f"Monthly consolidated report saved to '{monthly_path}'")
     
-    # Create per-person reports (aggregate by person)
-    person_reports = all_reports_df.groupby(['person', 'report_type']).agg({
-        'total_customers': 'sum',
-        'converted_customers': 'sum',
-        'all_sales_customers': 'sum',
-        'customers_not_converted': 'sum',
-        'sales_only_customers': 'sum'
-    }).reset_index()
-    
     # Calculate conversion rates for each person - based on all sales customers
     person_reports['conversion_rate'] = (person_reports['all_sales_customers'] / 
                                         person_reports['total_customers'] * 100).round(2)
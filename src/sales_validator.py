@@ -1,39 +1,37 @@
+import os
+import numpy as np
 import pandas as pd
+from compute_backend import PandasBackend
+from unit_context import UnitDataContext
+from id_keys import normalize_id_columns
 
-def validate_sales_in_activity(consolidated_data, sales_file):
+def validate_sales_in_activity(consolidated_data, sales_file, backend=None, context=None):
     """
     Check if all Job IDs in the sales file are present in the consolidated activity file.
+    backend is the compute backend for the key set math (default: pandas).
+    context is the work unit's UnitDataContext; passing the one shared with the
+    report stage avoids loading and normalizing the inputs twice.
     """
-    # Load the files
-    if isinstance(consolidated_data, str):
-        consolidated_data = pd.read_csv(consolidated_data)
+    if backend is None:
+        backend = PandasBackend()
+    
+    if context is None:
+        context = UnitDataContext(consolidated_data, sales_file)
     
-    sales_data = pd.read_csv(sales_file)
+    # Load the files
+    consolidated_data = context.consolidated_data
+    sales_data = context.sales_data
     
     # Print column names to identify the correct job ID column
     print("Columns in consolidated file:", consolidated_data.columns.tolist())
     print("Columns in sales file:", sales_data.columns.tolist())
     
-    # Try to identify the job ID column in both files
+    # Identify the job ID column in both files
     job_id_columns = {
-        'consolidated': None,
-        'sales': None
+        'consolidated': context.find_key_column('consolidated', 'job_id'),
+        'sales': context.find_key_column('sales', 'job_id')
     }
     
-    # Look for exact match 'Job ID' first
-    for file_type, df in [('consolidated', consolidated_data), ('sales', sales_data)]:
-        for col in df.columns:
-            if col.lower() == 'job id':
-                job_id_columns[file_type] = col
-                break
-        
-        # If not found, look for columns with 'job' and 'id'
-        if job_id_columns[file_type] is None:
-            possible_cols = [col for col in df.columns 
-                            if 'job' in col.lower() and 'id' in col.lower()]
-            if possible_cols:
-                job_id_columns[file_type] = possible_cols[0]
-    
     # Ensure we found columns in both files
     if job_id_columns['consolidated'] is None:
         print("ERROR: Cannot find a job ID column in the consolidated file.")
@@ -46,29 +44,20 @@ def validate_sales_in_activity(consolidated_data, sales_file):
     print(f"Using '{job_id_columns['consolidated']}' as the job ID column in consolidated file")
     print(f"Using '{job_id_columns['sales']}' as the job ID column in sales file")
     
-    # Fix integer-like float values (remove decimal points)
-    for file_type, df in [('consolidated', consolidated_data), ('sales', sales_data)]:
-        col = job_id_columns[file_type]
-        if pd.api.types.is_numeric_dtype(df[col]):
-            # Check if all values are integers (no decimal part)
-            if df[col].dropna().apply(lambda x: x == int(x)).all():
-                df[col] = df[col].fillna(-1).astype(int).astype(str)
-                df[col] = df[col].replace('-1', '')
-            else:
-                df[col] = df[col].astype(str).str.strip()
-        else:
-            df[col] = df[col].astype(str).str.strip()
+    # Bring both job ID columns to the same compact key type
+    context.get_keys('job_id')
     
     # Display sample job IDs from both files for debugging
     print("\nSample job IDs from consolidated data:", consolidated_data[job_id_columns['consolidated']].head(3).tolist())
     print("Sample job IDs from sales data:", sales_data[job_id_columns['sales']].head(3).tolist())
     
     # Get unique Job IDs from both files
-    consolidated_jobs = set(consolidated_data[job_id_columns['consolidated']].unique())
-    sales_jobs = set(sales_data[job_id_columns['sales']].unique())
+    consolidated_jobs = backend.distinct_keys(consolidated_data[job_id_columns['consolidated']])
+    sales_jobs = backend.distinct_keys(sales_data[job_id_columns['sales']])
     
     # Find missing jobs (in sales but not in consolidated data)
-    missing_jobs = sales_jobs - consolidated_jobs
+    missing_jobs = backend.key_difference(sales_data[job_id_columns['sales']],
+                                          consolidated_data[job_id_columns['consolidated']])
     
     # Print results
     print(f"\nTotal unique jobs in consolidated data: {len(consolidated_jobs)}")
@@ -77,7 +66,7 @@ def validate_sales_in_activity(consolidated_data, sales_file):
     if missing_jobs:
         print(f"WARNING: {len(missing_jobs)} sales jobs are NOT in the consolidated activity list.")
         print("Missing Job IDs (first few):")
-        for job in sorted(list(missing_jobs))[:10]:  # Show first 10 to avoid flooding the console
+        for job in sorted(missing_jobs, key=str)[:10]:  # Show first 10 to avoid flooding the console
             print(f"  - {job}")
         if len(missing_jobs) > 10:
             print(f"  ... and {len(missing_jobs) - 10} more")
@@ -92,4 +81,127 @@ def validate_sales_in_activity(consolidated_data, sales_file):
         missing_details.to_csv('missing_sales_jobs.csv', index=False)
         print(f"Details of missing jobs saved to 'missing_sales_jobs.csv'")
     
-    return is_complete, list(missing_jobs)
\ No newline at end of file
+    return is_complete, list(missing_jobs)
+
+class SalesValidationBatch:
+    """
+    Collects the job IDs of every person/report_type unit of one month so the
+    sales validation runs as a single vectorized anti-join instead of once
+    per unit. Only each unit's consolidated job ID column and sales rows are
+    kept, not the whole consolidated logs.
+    """
+    __slots__ = ("month", "units")
+    
+    def __init__(self, month):
+        self.month = month
+        self.units = []
+    
+    def add(self, person, report_type, consolidated_data, sales_file, context=None):
+        """
+        Queue a unit for validation. Returns False (and queues nothing) if
+        either file has no job ID column.
+        """
+        if context is None:
+            context = UnitDataContext(consolidated_data, sales_file)
+        
+        consolidated_col = context.find_key_column('consolidated', 'job_id')
+        sales_col = context.find_key_column('sales', 'job_id')
+        if consolidated_col is None or sales_col is None:
+            print(f"ERROR: Cannot find a job ID column for {person} - Month {self.month} - "
+                  f"Report Type: {report_type}, skipping its sales validation.")
+            return False
+        
+        consolidated_jobs, _ = context.get_keys('job_id')
+        self.units.append((person, report_type, consolidated_jobs, context.sales_data, sales_col))
+        return True
+    
+    @property
+    def keys(self):
+        """
+        The (person, report_type) pairs of the queued units.
+        """
+        return [(person, report_type) for person, report_type, _, _, _ in self.units]
+    
+    def validate(self):
+        """
+        Find, for every queued unit, the sales rows whose job ID is not in that
+        unit's consolidated activity logs.
+        
+        Returns a tidy DataFrame of the missing sales rows with 'Person',
+        'Report Type' and 'Job ID' columns in front of the sales columns.
+        """
+        if not self.units:
+            return pd.DataFrame(columns=['Person', 'Report Type', 'Job ID'])
+        
+        # One key type and one code space for the job IDs of every unit
+        job_columns = [column for _, _, consolidated_jobs, sales_data, sales_col in self.units
+                       for column in (consolidated_jobs, sales_data[sales_col])]
+        job_columns = normalize_id_columns(job_columns)
+        lengths = [len(column) for column in job_columns]
+        job_codes, job_values = pd.factorize(pd.concat(job_columns, ignore_index=True), use_na_sentinel=False)
+        
+        # Tag each job code with its unit so one anti-join covers the whole month
+        unit_codes = np.repeat(np.arange(len(job_columns)) // 2, lengths)
+        keys = unit_codes.astype(np.int64) * max(len(job_values), 1) + job_codes
+        is_sales = np.repeat(np.arange(len(job_columns)) % 2 == 1, lengths)
+        missing = ~np.isin(keys[is_sales], keys[~is_sales])
+        
+        missing_frames = []
+        sales_offset = 0
+        for (person, report_type, _, sales_data, _), sales_jobs in zip(self.units, job_columns[1::2]):
+            unit_missing = missing[sales_offset:sales_offset + len(sales_data)]
+            sales_offset += len(sales_data)
+            if not unit_missing.any():
+                continue
+            
+            missing_rows = sales_data[unit_missing]
+            missing_frames.append(pd.concat([
+                pd.DataFrame({'Person': person, 'Report Type': report_type, 'Job ID': sales_jobs[unit_missing]},
+                             index=missing_rows.index),
+                missing_rows.drop(columns=[col for col in missing_rows.columns
+                                           if col in ('Person', 'Report Type', 'Job ID')])
+            ], axis=1))
+        
+        if not missing_frames:
+            return pd.DataFrame(columns=['Person', 'Report Type', 'Job ID'])
+        return pd.concat(missing_frames, ignore_index=True)
+    
+    def print_summary(self, missing):
+        """
+        Print the number of missing sales jobs per unit.
+        """
+        counts = missing.groupby(['Person', 'Report Type']).size() if len(missing) else {}
+        for person, report_type in self.keys:
+            count = counts.get((person, report_type), 0)
+            if count:
+                print(f"WARNING: {person} - Month {self.month} - Report Type: {report_type}: "
+                      f"{count} sales rows have jobs that are NOT in the consolidated activity list.")
+            else:
+                print(f"SUCCESS: {person} - Month {self.month} - Report Type: {report_type}: "
+                      f"all sales jobs are present in the consolidated activity list.")
+
+def write_missing_sales_jobs(missing, output_dir, month, units):
+    """
+    Write a month's missing sales jobs to output_dir/missing_sales_jobs_month_<month>.csv.
+    
+    Rows of units (a list of (person, report_type) pairs) are replaced and
+    rows of other units already in the file are kept, so a run that only
+    reprocesses some units still leaves a complete table for the month.
+    """
+    # Kept next to the consolidated reports; the dashboard treats every
+    # directory in output_dir as a person
+    os.makedirs(output_dir, exist_ok=True)
+    missing_path = os.path.join(output_dir, f"missing_sales_jobs_month_{month}.csv")
+    
+    if os.path.exists(missing_path):
+        # Kept rows are written back exactly as read, so IDs don't turn into floats
+        existing = pd.read_csv(missing_path, dtype=str, keep_default_na=False)
+        replaced = pd.MultiIndex.from_tuples(units, names=['Person', 'Report Type'])
+        kept = existing[~pd.MultiIndex.from_frame(existing[['Person', 'Report Type']]).isin(replaced)]
+        if len(kept):
+            missing = pd.concat([kept, missing], ignore_index=True)
+    
+    missing = missing.sort_values(['Person', 'Report Type'], kind='stable')
+    missing.to_csv(missing_path, index=False)
+    print(f"Missing sales jobs for month {month} saved to '{missing_path}'")
+    return missing_path
\ No newline at end of file
@@ -0,0 +1,165 @@
+import os
+import pandas as pd
+
+# Supported intermediate formats for converted_inputs and their file extensions
+INTERMEDIATE_FORMATS = {
+    "csv": ".csv",
+    "parquet": ".parquet",
+    "feather": ".feather"
+}
+
+def get_table_format(file_path):
+    """
+    Work out the intermediate format of a file from its extension.
+    Unknown extensions are treated as CSV.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    for table_format, format_extension in INTERMEDIATE_FORMATS.items():
+        if extension == format_extension:
+            return table_format
+    return "csv"
+
+def write_table(df, file_path, table_format="csv", delimiter=',', quotechar='"', encoding='utf-8'):
+    """
+    Write a DataFrame in the given intermediate format.
+    Delimiter, quotechar and encoding only apply to CSV.
+    """
+    if table_format == "csv":
+        df.to_csv(file_path, index=False, sep=delimiter, quotechar=quotechar, encoding=encoding)
+        return file_path
+    
+    if table_format not in INTERMEDIATE_FORMATS:
+        raise ValueError(f"Unsupported intermediate format: {table_format}")
+    
+    # Arrow needs one type per column, so store mixed object columns (e.g. IDs
+    # that are numbers on some rows and text on others) as nullable strings
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True).startswith("mixed"):
+            df[col] = df[col].astype("string")
+    
+    if table_format == "parquet":
+        df.to_parquet(file_path, index=False)
+    else:
+        df.reset_index(drop=True).to_feather(file_path)
+    
+    return file_path
+
+def read_columns(data):
+    """
+    Return the column names of a converted input without loading its data.
+    """
+    if isinstance(data, pd.DataFrame):
+        return list(data.columns)
+    
+    table_format = get_table_format(data)
+    if table_format == "parquet":
+        import pyarrow.parquet as pq
+        return [name for name in pq.read_schema(data).names if not name.startswith("__index_level_")]
+    if table_format == "feather":
+        import pyarrow as pa
+        with pa.memory_map(data) as source:
+            return pa.ipc.open_file(source).schema.names
+    return list(pd.read_csv(data, nrows=0).columns)
+
+def read_table(data, columns=None):
+    """
+    Load a converted input as a DataFrame.
+    
+    Accepts a DataFrame or a path to a CSV, Parquet or Feather file. When
+    columns is given only those columns are loaded. DataFrames (in-memory
+    mode) are returned as shallow copies, so callers can reassign columns
+    without changing a frame that other people/report types share.
+    """
+    if isinstance(data, pd.DataFrame):
+        return data.copy(deep=False) if columns is None else data[columns].copy(deep=False)
+    
+    table_format = get_table_format(data)
+    if table_format == "parquet":
+        return pd.read_parquet(data, columns=columns)
+    if table_format == "feather":
+        return pd.read_feather(data, columns=columns)
+    return pd.read_csv(data, usecols=columns)
+
+def write_table_chunks(chunks, file_path, table_format, empty=None):
+    """
+    Write an iterator of DataFrame chunks with identical columns to a single
+    Parquet or Feather file, holding only one chunk in memory at a time.
+    empty is written when there are no chunks so the file still has a schema.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    if table_format not in ("parquet", "feather"):
+        raise ValueError(f"Unsupported chunked format: {table_format}")
+    
+    writer = None
+    schema = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                schema = table.schema
+                if table_format == "parquet":
+                    writer = pq.ParquetWriter(file_path, schema)
+                else:
+                    writer = pa.ipc.new_file(file_path, schema)
+            else:
+                table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            writer.write_table(table)
+        
+        if writer is None and empty is not None:
+            write_table(empty, file_path, table_format)
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    return file_path
+
+def iter_table_chunks(data, chunk_size, columns=None):
+    """
+    Load a converted input as DataFrames of at most chunk_size rows, holding
+    only one chunk in memory at a time. Accepts the same inputs as read_table
+    and always yields at least one (possibly empty) chunk.
+    """
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, max(len(data), 1), chunk_size):
+            yield read_table(data.iloc[start:start + chunk_size], columns=columns)
+        return
+    
+    table_format = get_table_format(data)
+    if table_format == "csv":
+        empty = True
+        for chunk in pd.read_csv(data, usecols=columns, chunksize=chunk_size):
+            empty = False
+            yield chunk
+        if empty:
+            yield pd.read_csv(data, usecols=columns, nrows=0)
+        return
+    
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    if table_format == "parquet":
+        parquet_file = pq.ParquetFile(data)
+        schema = parquet_file.schema_arrow
+        batches = parquet_file.iter_batches(batch_size=chunk_size, columns=columns)
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(data))
+        schema = reader.schema
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    
+    if columns is not None:
+        schema = pa.schema([schema.field(name) for name in columns], metadata=schema.metadata)
+    
+    empty = True
+    for batch in batches:
+        if columns is not None and batch.schema.names != columns:
+            batch = batch.select(columns)
+        # Feather batches can be larger than chunk_size
+        for start in range(0, batch.num_rows, chunk_size):
+            empty = False
+            table = pa.Table.from_batches([batch.slice(start, chunk_size)], schema=schema)
+            yield table.to_pandas()
+    if empty:
+        yield read_table(data, columns=columns).iloc[0:0]
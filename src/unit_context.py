@@ -0,0 +1,98 @@
+from table_io import read_table
+from input_schema import load_input
+from id_keys import normalize_id_columns
+
+def find_job_id_column(df):
+    """
+    Find the Job ID column of a DataFrame: an exact 'Job ID' match first, then
+    the first column with 'job' and 'id' in its name. Returns None if missing.
+    """
+    for col in df.columns:
+        if col.lower() == 'job id':
+            return col
+    
+    possible_cols = [col for col in df.columns
+                     if 'job' in col.lower() and 'id' in col.lower()]
+    return possible_cols[0] if possible_cols else None
+
+def find_customer_id_column(df):
+    """
+    Find the Customer ID column of a DataFrame: the first column with
+    'customer' and 'id' in its name, then any column mentioning 'customer'.
+    Returns None if missing.
+    """
+    for col in df.columns:
+        if 'customer' in col.lower() and 'id' in col.lower():
+            return col
+    
+    possible_cols = [col for col in df.columns if 'customer' in col.lower()]
+    return possible_cols[0] if possible_cols else None
+
+KEY_COLUMN_FINDERS = {
+    "job_id": find_job_id_column,
+    "customer_id": find_customer_id_column
+}
+
+class UnitDataContext:
+    """
+    The consolidated activity logs and sales data of one work unit, shared by
+    the validation and report stages so each input is loaded, searched for
+    its key columns and ID-normalized only once.
+    
+    consolidated_data and sales_file may be DataFrames or converted file
+    paths; they are loaded on first use. Normalized key columns are written
+    back into the frames, so the stages' output files show them normalized.
+    """
+    __slots__ = ("consolidated_source", "sales_source", "_consolidated_data", "_sales_data",
+                 "key_columns", "normalized_keys")
+    
+    def __init__(self, consolidated_data, sales_file):
+        self.consolidated_source = consolidated_data
+        self.sales_source = sales_file
+        self._consolidated_data = None
+        self._sales_data = None
+        self.key_columns = {}
+        self.normalized_keys = set()
+    
+    @property
+    def consolidated_data(self):
+        if self._consolidated_data is None:
+            if isinstance(self.consolidated_source, str):
+                self._consolidated_data = read_table(self.consolidated_source)
+            else:
+                self._consolidated_data = self.consolidated_source
+        return self._consolidated_data
+    
+    @property
+    def sales_data(self):
+        if self._sales_data is None:
+            self._sales_data = load_input(self.sales_source, "commission_isr")
+        return self._sales_data
+    
+    def get_frame(self, file_type):
+        """
+        Return the 'consolidated' or 'sales' DataFrame.
+        """
+        return self.consolidated_data if file_type == 'consolidated' else self.sales_data
+    
+    def find_key_column(self, file_type, key):
+        """
+        Return the name of the key column ("job_id" or "customer_id") in the
+        'consolidated' or 'sales' frame, or None if it has none.
+        """
+        if (file_type, key) not in self.key_columns:
+            self.key_columns[(file_type, key)] = KEY_COLUMN_FINDERS[key](self.get_frame(file_type))
+        return self.key_columns[(file_type, key)]
+    
+    def get_keys(self, key):
+        """
+        Return the (consolidated, sales) key columns for key, normalized to
+        the same compact key type. Both columns must exist.
+        """
+        consolidated_col = self.find_key_column('consolidated', key)
+        sales_col = self.find_key_column('sales', key)
+        if key not in self.normalized_keys:
+            self.consolidated_data[consolidated_col], self.sales_data[sales_col] = normalize_id_columns(
+                [self.consolidated_data[consolidated_col], self.sales_data[sales_col]])
+            self.normalized_keys.add(key)
+        return self.consolidated_data[consolidated_col], self.sales_data[sales_col]
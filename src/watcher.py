@@ -0,0 +1,168 @@
+import os
+import sys
+import time
+import glob
+import select
+import struct
+import ctypes
+import ctypes.util
+
+EXCEL_EXTENSIONS = (".xlsx", ".xls")
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT_HEADER = struct.Struct("iIII")
+
+def is_excel_file(file_path):
+    """
+    Check whether a path is an Excel workbook the pipeline reads, ignoring
+    the "~$" lock files Excel leaves next to open workbooks.
+    """
+    filename = os.path.basename(file_path)
+    return filename.lower().endswith(EXCEL_EXTENSIONS) and not filename.startswith("~$")
+
+def create_inotify_backend(directory):
+    """
+    Return a (next_changes, close) pair. next_changes(timeout) blocks for up
+    to timeout seconds (forever if None) and returns the set of paths in
+    directory that were written, moved or deleted; close() releases the
+    inotify file descriptor. Raises OSError where inotify is unavailable.
+    """
+    if not sys.platform.startswith("linux"):
+        raise OSError("inotify is only available on Linux")
+
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+    if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+        errno = ctypes.get_errno()
+        os.close(fd)
+        raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def next_changes(timeout=None):
+        readable, _, _ = select.select([fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset + INOTIFY_EVENT_HEADER.size <= len(data):
+            _, _, _, name_length = INOTIFY_EVENT_HEADER.unpack_from(data, offset)
+            offset += INOTIFY_EVENT_HEADER.size
+            name = data[offset:offset + name_length].rstrip(b"\0")
+            offset += name_length
+            if name:
+                changed.add(os.path.join(directory, os.fsdecode(name)))
+        return changed
+
+    def close():
+        os.close(fd)
+
+    return next_changes, close
+
+def snapshot_directory(directory):
+    """
+    Map every Excel file in directory to its (size, mtime).
+    """
+    snapshot = {}
+    for extension in EXCEL_EXTENSIONS:
+        for file_path in glob.glob(os.path.join(directory, "*" + extension)):
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            snapshot[file_path] = (stat.st_size, stat.st_mtime)
+    return snapshot
+
+def create_polling_backend(directory, poll_interval=1.0):
+    """
+    Polling equivalent of create_inotify_backend that compares directory
+    snapshots every poll_interval seconds.
+    """
+    state = {"snapshot": snapshot_directory(directory)}
+
+    def next_changes(timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = poll_interval if deadline is None else min(poll_interval, max(0, deadline - time.monotonic()))
+            time.sleep(wait)
+
+            current = snapshot_directory(directory)
+            previous = state["snapshot"]
+            changed = set(
+                file_path for file_path in set(current) | set(previous)
+                if current.get(file_path) != previous.get(file_path)
+            )
+            state["snapshot"] = current
+
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close():
+        pass
+
+    return next_changes, close
+
+def watch_directory(directory, on_change, debounce=2.0, poll_interval=1.0, backend="auto"):
+    """
+    Call on_change() whenever Excel files in directory are added, modified
+    or removed. Bursts of events (e.g. copying a batch of exports)
+    are collected until no new event arrives for debounce seconds, so they
+    trigger a single rebuild. Runs until interrupted with Ctrl+C.
+
+    backend is "inotify", "polling" or "auto" (inotify when available).
+    """
+    next_changes = None
+    if backend in ("auto", "inotify"):
+        try:
+            next_changes, close = create_inotify_backend(directory)
+            print(f"Watching {directory} for changes (inotify)...")
+        except (OSError, AttributeError) as e:
+            if backend == "inotify":
+                raise
+            print(f"inotify unavailable ({e}), falling back to polling")
+
+    if next_changes is None:
+        next_changes, close = create_polling_backend(directory, poll_interval)
+        print(f"Watching {directory} for changes (polling every {poll_interval}s)...")
+
+    try:
+        while True:
+            changed = set(path for path in next_changes(None) if is_excel_file(path))
+            if not changed:
+                continue
+
+            # Debounce: keep collecting until the directory has been quiet for a while
+            while True:
+                more = next_changes(debounce)
+                if not more:
+                    break
+                changed.update(path for path in more if is_excel_file(path))
+
+            print(f"\nDetected changes in {len(changed)} file(s):")
+            for file_path in sorted(changed):
+                print(f"  - {os.path.basename(file_path)}")
+
+            try:
+                on_change()
+            except Exception as e:
+                print(f"ERROR: Rebuild failed: {e}")
+
+            print(f"\nWatching {directory} for changes...")
+    except KeyboardInterrupt:
+        print("\nStopping watch mode.")
+    finally:
+        close()
@@ -0,0 +1,107 @@
+class WorkUnit:
+    """
+    One person/month/report_type unit of work and its file maps.
+    
+    The file map dicts are the same objects as in the paths structure built by
+    scan_input_files, so converted files recorded on a unit show up there too.
+    Units are small and picklable, which makes them cheap to hand to worker
+    processes.
+    """
+    __slots__ = ("person", "month", "report_type", "raw_files", "converted_dir",
+                 "converted_files", "output_dir", "output_files")
+    
+    def __init__(self, person, month, report_type, raw_files, converted_dir, converted_files,
+                 output_dir, output_files):
+        self.person = person
+        self.month = month
+        self.report_type = report_type
+        self.raw_files = raw_files
+        self.converted_dir = converted_dir
+        self.converted_files = converted_files
+        self.output_dir = output_dir
+        self.output_files = output_files
+    
+    @property
+    def key(self):
+        return (self.person, self.month, self.report_type)
+    
+    def __repr__(self):
+        return f"WorkUnit({self.person!r}, {self.month!r}, {self.report_type!r})"
+
+class WorkUnitIndex:
+    """
+    Flat, ordered collection of WorkUnits with lookups by person, month,
+    report type and (person, month, report_type) key.
+    """
+    __slots__ = ("units", "by_key", "by_person", "by_month", "by_report_type")
+    
+    def __init__(self, units=()):
+        self.units = []
+        self.by_key = {}
+        self.by_person = {}
+        self.by_month = {}
+        self.by_report_type = {}
+        for unit in units:
+            self.add(unit)
+    
+    def add(self, unit):
+        """
+        Add a unit, replacing any existing unit with the same key.
+        """
+        if unit.key in self.by_key:
+            self.units.remove(self.by_key[unit.key])
+            for index, value in ((self.by_person, unit.person), (self.by_month, unit.month),
+                                 (self.by_report_type, unit.report_type)):
+                index[value] = [u for u in index[value] if u.key != unit.key]
+        
+        self.units.append(unit)
+        self.by_key[unit.key] = unit
+        self.by_person.setdefault(unit.person, []).append(unit)
+        self.by_month.setdefault(unit.month, []).append(unit)
+        self.by_report_type.setdefault(unit.report_type, []).append(unit)
+    
+    def get(self, person, month, report_type):
+        """
+        Return the unit for person/month/report_type, or None.
+        """
+        return self.by_key.get((person, month, report_type))
+    
+    def filter(self, persons=None, months=None, report_types=None, keys=None):
+        """
+        Return a new index with the units matching every given criterion.
+        Each criterion is a collection of allowed values; None means any.
+        """
+        def matches(unit):
+            return ((persons is None or unit.person in persons)
+                    and (months is None or unit.month in months)
+                    and (report_types is None or unit.report_type in report_types)
+                    and (keys is None or unit.key in keys))
+        
+        return WorkUnitIndex(unit for unit in self.units if matches(unit))
+    
+    def __iter__(self):
+        return iter(self.units)
+    
+    def __len__(self):
+        return len(self.units)
+
+def build_work_unit_index(paths):
+    """
+    Flatten the nested paths["people"] structure from scan_input_files into a
+    WorkUnitIndex, in scan order.
+    """
+    index = WorkUnitIndex()
+    for person, person_data in paths["people"].items():
+        for month, month_data in person_data["months"].items():
+            for report_type, report_data in month_data["report_types"].items():
+                index.add(WorkUnit(
+                    person,
+                    month,
+                    report_type,
+                    report_data["raw_files"],
+                    report_data["converted_dir"],
+                    report_data["converted_files"],
+                    report_data["output_dir"],
+                    report_data["output_files"]
+                ))
+    return index
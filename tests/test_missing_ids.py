@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from parser import enrich_activity_logs, enrich_activity_logs_chunked
+from report_generator import generate_sales_conversion_report
+from compute_backend import get_backend
+
+BACKENDS = ["pandas"]
+try:
+    import duckdb  # noqa: F401
+    BACKENDS.append("duckdb")
+except ImportError:
+    pass
+
+@pytest.fixture
+def inputs(tmp_path, monkeypatch):
+    """
+    A jobs report with blank Customer IDs, an activity log with one job
+    missing from it and a sales file with a blank Customer ID.
+    """
+    monkeypatch.chdir(tmp_path)
+    pd.DataFrame({
+        "Job ID": [1, 2, 3, 4],
+        "Customer ID": [10, np.nan, 30, np.nan],
+        "Customer Name": ["A", "B", "C", "D"],
+        "Job Type": ["x", "y", "z", "w"]
+    }).to_csv("jobs.csv", index=False)
+    pd.DataFrame({
+        "Job ID": [1, 2, 2, 3, 4, 5],
+        "Action Performed": ["Call", "Call", "Email", "Visit", "Call", "Call"],
+        "Date": ["d"] * 6,
+        "Time": ["t"] * 6
+    }).to_csv("activity.csv", index=False)
+    pd.DataFrame({
+        "Job ID": [2, 3, 9],
+        "Customer ID": [np.nan, 30, 90],
+        "Amount": [1, 2, 3]
+    }).to_csv("sales.csv", index=False)
+    return tmp_path
+
+@pytest.mark.parametrize("backend_name", BACKENDS)
+@pytest.mark.parametrize("chunk_size", [0, 2])
+def test_blank_customer_ids_are_counted(inputs, backend_name, chunk_size):
+    # Blank Customer IDs used to be read as '', a customer of their own, while
+    # the activity row of job 5, which is not in the jobs report, was dropped
+    backend = get_backend(backend_name)
+    if chunk_size:
+        _, consolidated = enrich_activity_logs_chunked("activity.csv", "jobs.csv", chunk_size, backend=backend)
+    else:
+        _, consolidated = enrich_activity_logs("activity.csv", "jobs.csv", backend=backend)
+    
+    assert consolidated["Job ID"].tolist() == [1, 2, 2, 3, 4]
+    assert consolidated["Customer ID"].isna().tolist() == [False, True, True, False, True]
+    assert consolidated["Job Type"].tolist() == ["x", "y", "y", "z", "w"]
+    
+    report = generate_sales_conversion_report(consolidated, "sales.csv", backend=backend)
+    assert report["total_customers"] == 3
+    assert report["converted_customers"] == 2
+    assert report["all_sales_customers"] == 3
+    assert report["conversion_rate"] == 100.0
+    assert report["customers_not_converted"] == 1
+    assert report["sales_only_customers"] == 1
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+from sales_validator import SalesValidationBatch, write_missing_sales_jobs
+
+def make_unit_inputs(tmp_path, person):
+    """
+    Write a unit's sales file and return (consolidated logs, sales file path).
+    Only job 1 has activity, and one missing job has a blank Customer ID.
+    """
+    consolidated = pd.DataFrame({
+        "Customer ID": pd.array([10], dtype="Int64"),
+        "Job ID": pd.array([1], dtype="Int64"),
+        "Count": [1]
+    })
+    sales_file = tmp_path / f"{person}_sales.csv"
+    pd.DataFrame({
+        "Job ID": [1, 2, 3],
+        "Customer ID": [10, np.nan, 30],
+        "Amount": [100.5, 200.0, 300.25]
+    }).to_csv(sales_file, index=False)
+    return consolidated, str(sales_file)
+
+def validate_units(tmp_path, people, output_dir):
+    batch = SalesValidationBatch("1")
+    for person in people:
+        batch.add(person, "all", *make_unit_inputs(tmp_path, person))
+    return write_missing_sales_jobs(batch.validate(), str(output_dir), "1", batch.keys)
+
+def test_incremental_run_matches_full_run(tmp_path):
+    full_path = validate_units(tmp_path, ["alice", "bob"], tmp_path / "full")
+    
+    # An incremental run reprocesses bob only and keeps alice's rows from the file
+    validate_units(tmp_path, ["alice", "bob"], tmp_path / "incremental")
+    incremental_path = validate_units(tmp_path, ["bob"], tmp_path / "incremental")
+    
+    with open(full_path) as f:
+        full = f.read()
+    with open(incremental_path) as f:
+        incremental = f.read()
+    assert incremental == full
+    assert "alice,all,2,,200.0" in full
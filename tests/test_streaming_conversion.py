@@ -0,0 +1,34 @@
+import datetime
+import openpyxl
+import pytest
+from excel_to_csv import convert_file, stream_convert_file
+
+@pytest.fixture
+def workbook(tmp_path):
+    """
+    A workbook mixing the cell types the streaming converter has to format
+    exactly as pandas does, including fractional-second times.
+    """
+    path = tmp_path / "mixed.xlsx"
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["Job ID", "Amount", "Note", "Date", "Timestamp", "Logged At", "Flag"])
+    ws.append([1001, 12.5, "first", datetime.datetime(2024, 1, 5),
+               datetime.datetime(2024, 1, 5, 9, 30, 15, 123000), datetime.datetime(2024, 1, 5, 9, 30), True])
+    ws.append([1002, None, "NA", datetime.datetime(2024, 1, 6),
+               datetime.datetime(2024, 1, 6, 14, 0, 0, 500000), datetime.datetime(2024, 1, 6, 10, 15, 30), False])
+    ws.append([None, 3, "", datetime.datetime(2024, 1, 7),
+               datetime.datetime(2024, 1, 7, 8, 0, 1), None, True])
+    wb.save(path)
+    return str(path)
+
+def test_streaming_csv_matches_pandas(workbook, tmp_path):
+    pandas_path = convert_file(workbook, str(tmp_path / "pandas.csv"))
+    streamed_path = stream_convert_file(workbook, str(tmp_path / "streamed.csv"), chunk_size=2)
+    
+    with open(pandas_path, 'rb') as f:
+        expected = f.read()
+    with open(streamed_path, 'rb') as f:
+        streamed = f.read()
+    assert streamed == expected
+    assert b"2024-01-05 09:30:15.123" in expected
@@ -54,6 +54,10 @@ def find_all_reports(base_dir):
         if not os.path.isdir(person_dir):
             continue
         
+        # Skip shared directories such as the chart assets
+        if not glob.glob(os.path.join(person_dir, 'month_*')):
+            continue
+        
         person_name = os.path.basename(person_dir)
         if person_name not in all_reports['people']:
             all_reports['people'][person_name] = {'months': {}}